@@ -19,6 +19,9 @@ logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # built before serving so requests never wait on node code being imported
+    await asyncio.to_thread(compute.graph.manifest.templates)
+
     asyncio.create_task(services.file_watcher())
     asyncio.create_task(compute.executor())
 
@@ -43,3 +46,6 @@ import api.routers as routers
 
 app.include_router(routers.graph)
 app.include_router(routers.files)
+app.include_router(routers.jobs)
+app.include_router(routers.metrics)
+app.include_router(routers.executor)
@@ -1,3 +1,9 @@
-from .executor import Executor, executor
+from .executor import Executor
+from .pool import ExecutorPool, executor
+from .plan import ExecutionPlan
+from .jobs import Job, JobState
+from .telemetry import NodeEvent, metrics
+from .results import ResultHandle, results
+from .resources import ResourceManager, CoreAssignment, resources
 
 from . import graph
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import sys
+from collections import OrderedDict
+from typing import Any
+
+import torch
+from pydantic import BaseModel
+
+
+def sizeof(obj: Any) -> int:
+    match obj:
+        case torch.Tensor():
+            return obj.element_size() * obj.nelement()
+        case torch.nn.Module():
+            # also counts the packed weights of quantized modules
+            return sizeof(obj.state_dict())
+        case BaseModel():
+            return sum(sizeof(v) for v in obj.__dict__.values())
+        case dict():
+            return sum(sizeof(v) for v in obj.values())
+        case list() | tuple() | set():
+            return sum(sizeof(v) for v in obj)
+        case _:
+            return sys.getsizeof(obj)
+
+
+class NodeCache:
+    def __init__(self, budget: int):
+        self._budget = budget
+        self._size = 0
+        self._entries: OrderedDict[str, tuple[Any, int]] = OrderedDict()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def keys(self):
+        return self._entries.keys()
+
+    def get(self, key: str) -> Any:
+        self._entries.move_to_end(key)
+
+        return self._entries[key][0]
+
+    def put(self, key: str, value: Any):
+        if key in self._entries:
+            self.remove(key)
+
+        if (size := sizeof(value)) > self._budget:
+            return
+
+        self._entries[key] = (value, size)
+        self._size += size
+
+        while self._size > self._budget:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._size -= size
+
+    def remove(self, key: str):
+        _, size = self._entries.pop(key)
+        self._size -= size
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
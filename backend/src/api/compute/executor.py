@@ -1,28 +1,36 @@
 from __future__ import annotations
 
 import os
-import torch
 import signal
 import asyncio
 import multiprocessing as mp
 from multiprocessing.connection import Connection
 from multiprocessing.synchronize import Event
+from multiprocessing.sharedctypes import Synchronized
+from os import environ as env
 
 import logging
 import logging.config
 
 import enum
-from typing import Any
+from typing import Any, Callable, NamedTuple
 from pydantic import BaseModel
 
 import api.utils as utils
 import api.services as services
 
 from . import graph
+from . import plan
+from .jobs import Job, JobState
+from .telemetry import NodeEvent, NodeStage, CacheStatus, metrics, peak_rss
+from .results import ResultHandle, results, share
+from .resources import CoreAssignment
 
 logging.config.dictConfig(utils.LOGGING_CONFIG)
 logger = logging.getLogger(__name__)
 
+PLAN_CACHE_SIZE = 64
+
 
 class IPCMessage(BaseModel):
     type: Type
@@ -35,16 +43,82 @@ class IPCMessage(BaseModel):
         INFO = enum.auto()
 
 
+# the nested enum is only in scope once the class exists
+IPCMessage.update_forward_refs(Type=IPCMessage.Type)
+
+
+@enum.unique
+class Control(enum.IntEnum):
+    NONE = 0
+    CANCEL = enum.auto()
+    SUSPEND = enum.auto()
+
+
+class Device(NamedTuple):
+    type: str
+    index: int | None = None
+
+    @classmethod
+    def parse(cls, device: str) -> Device:
+        type, _, index = device.partition(":")
+
+        return cls(type, int(index) if index else None)
+
+    def __str__(self) -> str:
+        return self.type if self.index is None else f"{self.type}:{self.index}"
+
+
+class GraphAction(BaseModel):
+    version: int
+    func: str
+    kwargs: dict[str, Any]
+
+
+class NodeReload(BaseModel):
+    version: int
+    units: set[str]
+    types: set[str]
+
+
+class JobStatus(BaseModel):
+    id: int
+    state: JobState
+    keys: set[str]
+
+
 class Executor:
-    def __init__(self, device: torch.device, queue: mp.Queue = None):
+    def __init__(
+        self,
+        device: Device,
+        queue: mp.Queue = None,
+        cache_budget: int = int(env.get("CACHE_BUDGET", 8 * 2**30)),
+        assignment: CoreAssignment | None = None,
+        compile_mode: str | None = env.get("COMPILE_MODE"),
+    ):
         self._device = device
+        self._assignment = assignment
         self._queue = queue if queue else mp.Queue()
         self._pipe, send_pipe = mp.Pipe(duplex=False)
         self._shutdown_event = mp.Event()
+        self._control = mp.Value("i", Control.NONE)
         self._process = mp.Process(
             target=utils.suppress_std(process),
-            args=(device, self._queue, send_pipe, self._shutdown_event),
+            args=(
+                device,
+                self._queue,
+                send_pipe,
+                self._shutdown_event,
+                self._control,
+                cache_budget,
+                assignment,
+                compile_mode,
+            ),
         )
+
+        self.job: Job | None = None
+        self.resident: set[str] = set()
+        self.on_idle: Callable[[Executor, JobStatus], None] | None = None
+
         self._pipe_callback = asyncio.Event()
 
         asyncio.get_event_loop().add_reader(
@@ -57,26 +131,66 @@ class Executor:
             await self._pipe_callback.wait()
 
             try:
-                data: IPCMessage = self._pipe.recv()
+                data: IPCMessage | JobStatus | NodeEvent | ResultHandle = (
+                    self._pipe.recv()
+                )
             except EOFError:
                 continue
 
-            d = {"device": f"{self._device.type}:{self._device.index}"}
+            d = {"device": self.name}
+
+            match data:
+                case NodeEvent():
+                    data.worker = self.name
+                    metrics.record_node(data)
+
+                    await services.websocket_handler.broadcast("executor", data)
+                case ResultHandle():
+                    results.put(data)
+                case JobStatus():
+                    self.job = None
+                    self.resident = data.keys
 
-            match data.type:
-                case IPCMessage.Type.ERROR:
+                    metrics.record_job(self.name, data.state)
+
+                    if self.on_idle:
+                        self.on_idle(self, data)
+                case IPCMessage(type=IPCMessage.Type.ERROR):
                     logger.error(data.msg, extra=d)
-                case IPCMessage.Type.WARNING:
+                case IPCMessage(type=IPCMessage.Type.WARNING):
                     logger.warning(data.msg, extra=d)
-                case IPCMessage.Type.INFO:
+                case IPCMessage(type=IPCMessage.Type.INFO):
                     logger.info(data.msg, extra=d)
 
-            # TODO: do something with data
-
             self._pipe_callback.clear()
 
-    def enqueue(self, graph: graph.ComputeGraph, id: int | None = None):
-        self._queue.put_nowait((id, graph))
+    @property
+    def device(self) -> Device:
+        return self._device
+
+    @property
+    def name(self) -> str:
+        return f"{self._device.type}:{self._device.index}"
+
+    @property
+    def idle(self) -> bool:
+        return self.job is None
+
+    @property
+    def assignment(self) -> CoreAssignment | None:
+        return self._assignment
+
+    @property
+    def control(self) -> Control:
+        return Control(self._control.value)
+
+    def enqueue(self, job: Job):
+        self.job = job
+        self._control.value = Control.NONE
+        self._queue.put_nowait(job)
+
+    def update(self, action: GraphAction | NodeReload):
+        self._queue.put_nowait(action)
 
     def pause(self):
         os.kill(self._process.pid, signal.SIGSTOP)
@@ -87,6 +201,12 @@ class Executor:
     def interrupt(self):
         os.kill(self._process.pid, signal.SIGINT)
 
+    def cancel(self):
+        self._control.value = Control.CANCEL
+
+    def suspend(self):
+        self._control.value = Control.SUSPEND
+
     def cleanup(self):
         self._queue.close()
 
@@ -99,69 +219,177 @@ class Executor:
         self._process.join()
 
 
-def process(device, queue: mp.Queue, pipe: Connection, shutdown_event: Event):
+def process(
+    device: Device,
+    queue: mp.Queue,
+    pipe: Connection,
+    shutdown_event: Event,
+    control: Synchronized,
+    cache_budget: int,
+    assignment: CoreAssignment | None,
+    compile_mode: str | None,
+):
+    import time
     import warnings
     import traceback
+    from collections import OrderedDict
+
+    if assignment:
+        assignment.apply()
 
-    import networkx as nx
-    import torch._dynamo as dynamo
-    import torch._dynamo.config as dynamo_config
+    import torch
+
+    from . import cache
 
     warnings.simplefilter("ignore")
 
-    torch.set_default_device(device)
-    dynamo_config.suppress_errors = True
-    cache: dict[str, Any] = {}
+    graph.loader.load_nodes()
+
+    torch.set_default_device(str(device))
+    node_cache = cache.NodeCache(cache_budget)
+    graph_ = graph.ComputeGraph()
+    version = 1
+    node_results: dict[int, tuple[int, str]] = {}
+    plans: OrderedDict[tuple[str, int | None], plan.ExecutionPlan] = OrderedDict()
     while not shutdown_event.is_set():
+        job = None
         try:
-            id: int
-            graph_: graph.ComputeGraph
-
-            id, graph_ = queue.get()
-
-            if not nx.is_directed_acyclic_graph(graph_):
-                raise Exception("Graph contains cycle")
-
-            exec_order: dict[int, graph.Node] = {
-                n: graph_.nodes[n]["obj"]
-                for n in nx.topological_sort(graph_)
-                if n
-                in set(
-                    next(c for c in cs if id in c)
-                    if id
-                    else max(cs := nx.weakly_connected_components(graph_), key=len)
+            match msg := queue.get():
+                case GraphAction():
+                    getattr(graph_, msg.func)(**msg.kwargs)
+                    version = msg.version
+                    continue
+                case NodeReload():
+                    try:
+                        graph.loader.reload(msg.units)
+                    finally:
+                        graph_.invalidate_types(msg.types)
+                        version = msg.version
+                    continue
+                case Job():
+                    job = msg
+                    state = JobState.DONE
+
+            # position-only actions never reach workers, so only a newer graph counts
+            if version > job.version:
+                pipe.send(
+                    IPCMessage(
+                        type=IPCMessage.Type.WARNING,
+                        msg=f"Job queued at graph version {job.version} runs at version {version}",
+                    )
                 )
-            }
-
-            @torch.compile
-            def exec():
-                outputs = {}
-                for k, v in exec_order.items():
-                    inputs = {
-                        m[1]: outputs[n][m[0]]
-                        for n in graph_.predecessors(k)
-                        for m in graph_.edges[n, k]["map"]
-                    }
 
-                    try:
-                        outputs[k] = v(**inputs)
-                        pipe.send(
-                            IPCMessage(type=IPCMessage.Type.INFO, msg=str(outputs[k]))
-                        )
-                    except Exception:
-                        pipe.send(
-                            IPCMessage(
-                                type=IPCMessage.Type.ERROR,
-                                msg=f"Node '{k}' ({type(v).__name__}) raised an exception. {traceback.format_exc()}",
+            for n in node_results.keys() - graph_.nodes:
+                del node_results[n]
+
+            if (plan_key := (graph_.topology_key(), job.target)) in plans:
+                plans.move_to_end(plan_key)
+            else:
+                plans[plan_key] = plan.ExecutionPlan(graph_, job.target)
+
+                if len(plans) > PLAN_CACHE_SIZE:
+                    plans.popitem(last=False)
+
+            plan_ = plans[plan_key]
+            outputs: list[dict[str, Any]] = [None] * len(plan_)
+
+            def publish(i: int, k: int):
+                if i not in plan_.sinks:
+                    return
+
+                for o, x in outputs[i].items():
+                    for name, item in (
+                        ((f"{o}.{n}", y) for n, y in enumerate(x))
+                        if isinstance(x, graph.Batch)
+                        else [(o, x)]
+                    ):
+                        if handle := share(job.id, k, name, item):
+                            pipe.send(handle)
+
+            for i, k in enumerate(plan_.order):
+                match control.value:
+                    case Control.CANCEL:
+                        state = JobState.CANCELLED
+                        break
+                    case Control.SUSPEND:
+                        state = JobState.SUSPENDED
+                        break
+
+                v = graph_.instance(k)
+
+                event = NodeEvent(
+                    job=job.id,
+                    node=k,
+                    type=type(v).__name__,
+                    stage=NodeStage.END,
+                    cache=CacheStatus.HIT,
+                )
+
+                # outputs stay owned by the node cache, a clean node only skips keying
+                if (result := node_results.get(k)) and result[0] == graph_.revision(k):
+                    if (key := result[1]) in node_cache:
+                        outputs[i] = node_cache.get(key)
+                        pipe.send(event)
+                        continue
+                else:
+                    key = graph_.node_key(k)
+
+                    if key in node_cache:
+                        outputs[i] = node_cache.get(key)
+                        node_results[k] = (graph_.revision(k), key)
+                        publish(i, k)
+                        pipe.send(event)
+                        continue
+
+                inputs = {vh: outputs[j][uh] for j, uh, vh in plan_.inputs[i]}
+
+                event.cache = CacheStatus.MISS
+                pipe.send(event.copy(update={"stage": NodeStage.START}))
+                start = time.perf_counter()
+
+                try:
+                    outputs[i] = v.run(**inputs)
+
+                    if compile_mode and v.template.compile:
+                        outputs[i] = {
+                            o: (
+                                torch.compile(x, mode=compile_mode)
+                                if o in v.template.compile
+                                and isinstance(x, torch.nn.Module)
+                                else x
                             )
+                            for o, x in outputs[i].items()
+                        }
+
+                    if v.template.cache:
+                        node_cache.put(key, outputs[i])
+                    node_results[k] = (graph_.revision(k), key)
+
+                    event.bytes = cache.sizeof(outputs[i])
+
+                    publish(i, k)
+                except Exception:
+                    pipe.send(
+                        IPCMessage(
+                            type=IPCMessage.Type.ERROR,
+                            msg=f"Node '{k}' ({type(v).__name__}) raised an exception. {traceback.format_exc()}",
                         )
-                        return
+                    )
+                    event.failed = True
+                    state = JobState.FAILED
+                finally:
+                    event.time = time.perf_counter() - start
+                    event.rss = peak_rss()
+                    pipe.send(event)
 
-            exec()
+                if state is JobState.FAILED:
+                    break
 
         except KeyboardInterrupt:
+            state = JobState.CANCELLED
             continue
         except Exception:
+            state = JobState.FAILED
             pipe.send(
                 IPCMessage(
                     type=IPCMessage.Type.ERROR,
@@ -169,8 +397,20 @@ def process(device, queue: mp.Queue, pipe: Connection, shutdown_event: Event):
                 )
             )
             continue
+        finally:
+            if job is not None:
+                pipe.send(
+                    JobStatus(
+                        id=job.id,
+                        state=state,
+                        keys=set(node_cache.keys())
+                        | {
+                            key
+                            for k, (_, key) in node_results.items()
+                            if (obj := graph_.nodes[k].get("obj"))
+                            and not obj.template.cache
+                        },
+                    )
+                )
 
     pipe.close()
-
-
-executor = Executor(torch.device("cpu", 0))
@@ -20,6 +20,18 @@ class Checkbox(Component):
     default: bool
 
 
+class Dropdown(Component):
+    default: str
+    options: list[str]
+
+    @validator("options")
+    def default_option(options, values):
+        if "default" in values and values["default"] not in options:
+            raise ValueError(f"Default '{values['default']}' is not an option")
+
+        return options
+
+
 class FileDropdown(Component):
     directory: list[str]
 
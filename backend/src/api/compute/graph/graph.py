@@ -2,6 +2,8 @@ from __future__ import annotations
 from typing import Any
 
 import re
+import json
+import hashlib
 import networkx as nx
 
 import api.utils as utils
@@ -10,23 +12,138 @@ from . import node
 
 
 class ComputeGraph(nx.DiGraph):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.graph.setdefault("revision", 0)
+        self.graph.setdefault("generations", {})
+
+    def mark_dirty(self, *ids: int):
+        self.graph["revision"] += 1
+
+        for n in set(ids).union(*(nx.descendants(self, id) for id in ids)):
+            self.nodes[n]["revision"] = self.graph["revision"]
+
+    def revision(self, id: int) -> int:
+        return self.nodes[id]["revision"]
+
+    def component(self, id: int | None = None) -> set[int]:
+        if id is not None and id not in self:
+            raise KeyError(f"Node {id} is not in the graph")
+
+        components = list(nx.weakly_connected_components(self))
+
+        if not components:
+            return set()
+
+        return (
+            next(c for c in components if id in c)
+            if id is not None
+            else max(components, key=len)
+        )
+
+    def topology_key(self) -> str:
+        """
+        Hash of the node types and edge wiring, memoized until the structure changes
+        """
+
+        if not self.graph.get("topology"):
+            self.graph["topology"] = hashlib.sha256(
+                json.dumps(
+                    {
+                        "nodes": sorted((n, self.nodes[n]["type"]) for n in self.nodes),
+                        "edges": sorted(
+                            (u, v, sorted(self.edges[u, v]["map"]))
+                            for u, v in self.edges
+                        ),
+                    }
+                ).encode()
+            ).hexdigest()
+
+        return self.graph["topology"]
+
+    def node_key(self, id: int) -> str:
+        """
+        Content hash of a node's type, values and the keys of its upstream inputs,
+        memoized until the node is next marked dirty
+        """
+
+        if (key := self.nodes[id].get("key")) and key[0] == self.revision(id):
+            return key[1]
+
+        key = hashlib.sha256(
+            json.dumps(
+                {
+                    "type": self.nodes[id]["type"],
+                    "generation": self.graph["generations"].get(self.nodes[id]["type"]),
+                    "values": self.nodes[id]["values"],
+                    "inputs": {
+                        vh: (self.node_key(u), uh)
+                        for u in self.predecessors(id)
+                        for uh, vh in self.edges[u, id]["map"]
+                    },
+                },
+                sort_keys=True,
+                default=repr,
+            ).encode()
+        ).hexdigest()
+
+        self.nodes[id]["key"] = (self.revision(id), key)
+
+        return key
+
+    def instance(self, id: int) -> node.Node:
+        """
+        Node object of a graph node, only created by processes that loaded node code
+        """
+
+        if not (obj := self.nodes[id].get("obj")):
+            obj = self.nodes[id]["obj"] = node.nodes[self.nodes[id]["type"]](
+                self.nodes[id]["values"], self.nodes[id]["position"]
+            )
+
+        return obj
+
+    def invalidate_types(self, types: set[str]):
+        """
+        Drops the node objects of the given types and changes the keys of those nodes
+        and everything downstream, for when their code changed
+        """
+
+        for type in types:
+            self.graph["generations"][type] = self.graph["generations"].get(type, 0) + 1
+
+        if ids := [n for n in self.nodes if self.nodes[n]["type"] in types]:
+            for n in ids:
+                self.nodes[n].pop("obj", None)
+
+            self.mark_dirty(*ids)
+
     def add_node(self, id: int, type: str, values: dict, position: dict) -> dict:
-        obj = node.nodes[type](values, position)
+        super().add_node(id, type=type, values=dict(values), position=position)
+        self.graph["topology"] = None
 
-        super().add_node(id, obj=obj)
+        self.mark_dirty(id)
 
     def update_position_node(self, id: int, position: dict[str, int]) -> dict:
-        obj: node.Node = self.nodes[id]["obj"]
+        self.nodes[id]["position"] = position
 
-        obj.position = position
+        if obj := self.nodes[id].get("obj"):
+            obj.position = position
 
     def update_values_node(self, id: int, values: dict[str, Any]) -> dict:
-        obj: node.Node = self.nodes[id]["obj"]
+        self.nodes[id]["values"].update(values)
+
+        if obj := self.nodes[id].get("obj"):
+            obj.values = values
 
-        obj.values = values
+        self.mark_dirty(id)
 
     def remove_node(self, id: int) -> dict:
+        self.mark_dirty(*self.successors(id))
+
         super().remove_node(id)
+        self.graph["topology"] = None
 
     def add_edge(
         self, id: str, source: int, target: int, sourceHandle: str, targetHandle: str
@@ -36,6 +153,10 @@ class ComputeGraph(nx.DiGraph):
         else:
             super().add_edge(source, target, map={(sourceHandle, targetHandle)})
 
+        self.graph["topology"] = None
+
+        self.mark_dirty(target)
+
     def remove_edge(self, id: str) -> dict:
         u, uh, v, vh = re.findall("e(\d*)(\w+)-(\d*)(\w+)", id)[0]
 
@@ -45,6 +166,10 @@ class ComputeGraph(nx.DiGraph):
         if not self.edges[u, v]["map"]:
             super().remove_edge(u, v)
 
+        self.graph["topology"] = None
+
+        self.mark_dirty(v)
+
     def convert_nodes(self):
         for n in self.nodes:
             yield self.convert_node(n)
@@ -54,13 +179,11 @@ class ComputeGraph(nx.DiGraph):
             yield from self.convert_edge(u, v)
 
     def convert_node(self, id: int) -> utils.GraphNodeSchema:
-        obj: node.Node = self.nodes[id]["obj"]
-
         return {
             "id": id,
-            "type": type(obj).__name__,
-            "values": obj.values,
-            "position": obj.position,
+            "type": self.nodes[id]["type"],
+            "values": self.nodes[id]["values"],
+            "position": self.nodes[id]["position"],
         }
 
     def convert_edge(self, u: int, v: int) -> list[utils.GraphEdgeSchema]:
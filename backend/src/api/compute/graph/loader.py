@@ -0,0 +1,161 @@
+import os
+import sys
+import glob
+import logging
+import logging.config
+import importlib.util
+import importlib.machinery
+
+from os import environ as env
+
+import api.utils as utils
+
+from . import node
+
+logging.config.dictConfig(utils.LOGGING_CONFIG)
+logger = logging.getLogger(__name__)
+
+nodes_path = os.path.join(env["DATA_DIR"], "nodes")
+
+nodes_spec = importlib.machinery.ModuleSpec(
+    nodes_name := f"api.compute.graph.nodes", None, is_package=True
+)
+nodes_spec.submodule_search_locations.append(nodes_path)
+
+nodes = importlib.util.module_from_spec(nodes_spec)
+sys.modules[nodes_name] = nodes
+
+
+def module_path_name(package_name: str, module_path) -> str:
+    return f"{package_name}.{os.path.splitext(os.path.basename(module_path))[0]}"
+
+
+def load_module(package_name: str, module_path):
+    module_spec = importlib.util.spec_from_file_location(
+        module_name := module_path_name(package_name, module_path),
+        module_path,
+    )
+    module = importlib.util.module_from_spec(module_spec)
+    sys.modules[module_name] = module
+    module_spec.loader.exec_module(module)
+
+    return module_name
+
+
+def load_package(package_path):
+    package_spec = importlib.machinery.ModuleSpec(
+        package_name := f"{nodes_name}.{os.path.splitext(os.path.basename(package_path))[0]}",
+        None,
+        is_package=True,
+    )
+    package_spec.submodule_search_locations.append(package_path)
+
+    package = importlib.util.module_from_spec(package_spec)
+
+    sys.modules[package_name] = package
+
+    return package_name
+
+
+def units() -> list[str]:
+    """
+    Top-level modules and packages under `DATA_DIR/nodes`, the granularity at which
+    node code is loaded and reloaded since modules of a package import each other
+    """
+
+    return sorted(
+        name
+        for name in os.listdir(nodes_path)
+        if not name.startswith("__")
+        and (name.endswith(".py") or os.path.isdir(os.path.join(nodes_path, name)))
+    )
+
+
+def unit(path: str) -> str | None:
+    """
+    Unit containing a node source file, if it is one
+    """
+
+    if not path.endswith(".py") or (
+        rel := os.path.relpath(os.path.abspath(path), os.path.abspath(nodes_path))
+    ).startswith(os.pardir):
+        return None
+
+    return rel.split(os.sep)[0]
+
+
+def unit_types(unit: str) -> set[str]:
+    prefix = f"{nodes_name}.{os.path.splitext(unit)[0]}"
+
+    return {
+        k
+        for k, v in node.nodes.items()
+        if v.__module__ == prefix or v.__module__.startswith(f"{prefix}.")
+    }
+
+
+def load_unit(unit: str):
+    if os.path.isfile(path := os.path.join(nodes_path, unit)):
+        module_name = load_module(nodes_name, path)
+        logger.info(f"Loaded nodes submodule {module_name}")
+        return
+
+    package_name = load_package(path)
+    logger.info(f"Loaded nodes subpackage {package_name}")
+
+    for module_path in sorted(glob.glob(os.path.join(path, "*.py"))):
+        if module_path_name(package_name, module_path) in sys.modules:
+            # already imported by another module of the package
+            continue
+
+        module_name = load_module(package_name, module_path)
+        logger.info(f"Loaded {package_name.split('.')[-1]} submodule {module_name}")
+
+
+def unload_unit(unit: str) -> set[str]:
+    """
+    Forgets the modules of a unit and the node types they registered, returning those
+    types
+    """
+
+    types = unit_types(unit)
+
+    for k in types:
+        del node.nodes[k]
+
+    prefix = f"{nodes_name}.{os.path.splitext(unit)[0]}"
+
+    for module_name in [
+        m for m in sys.modules if m == prefix or m.startswith(f"{prefix}.")
+    ]:
+        del sys.modules[module_name]
+
+    return types
+
+
+def load_nodes():
+    """
+    Runs all node code under `DATA_DIR/nodes`, only ever done by processes that
+    execute nodes since it pulls in their heavy dependencies
+    """
+
+    for unit_ in units():
+        load_unit(unit_)
+
+
+def reload(units_: set[str]) -> set[str]:
+    """
+    Reloads the given units, those that no longer exist are only unloaded. Returns
+    every node type that was removed or (re)defined
+    """
+
+    types = set()
+
+    for unit_ in units_:
+        types |= unload_unit(unit_)
+
+        if os.path.exists(os.path.join(nodes_path, unit_)):
+            load_unit(unit_)
+            types |= unit_types(unit_)
+
+    return types
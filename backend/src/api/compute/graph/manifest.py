@@ -0,0 +1,123 @@
+import os
+import glob
+import json
+import itertools
+import multiprocessing as mp
+from os import environ as env
+
+import logging
+import logging.config
+
+import api.utils as utils
+
+from . import node
+from . import loader
+
+logging.config.dictConfig(utils.LOGGING_CONFIG)
+logger = logging.getLogger(__name__)
+
+MANIFEST_PATH = os.path.join(env["DATA_DIR"], "cache", "nodes.json")
+
+_manifest: dict | None = None
+
+
+def sources() -> dict[str, list[int]]:
+    """
+    Size and mtime of every node source file, a manifest is current while these match
+    """
+
+    return {
+        os.path.relpath(path, loader.nodes_path): [
+            (stat := os.stat(path)).st_size,
+            stat.st_mtime_ns,
+        ]
+        for path in sorted(
+            glob.glob(os.path.join(loader.nodes_path, "*.py"))
+            + glob.glob(os.path.join(loader.nodes_path, "*", "*.py"))
+        )
+    }
+
+
+def build():
+    """
+    Loads all node code and writes the templates of the registered nodes
+    """
+
+    sources_ = sources()
+
+    loader.load_nodes()
+
+    os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+    with open(tmp := f"{MANIFEST_PATH}.{os.getpid()}", "w") as f:
+        json.dump(
+            {
+                "sources": sources_,
+                "templates": {k: v.template.dict() for k, v in node.nodes.items()},
+                "units": {
+                    k: unit for unit in loader.units() for k in loader.unit_types(unit)
+                },
+            },
+            f,
+        )
+    os.replace(tmp, MANIFEST_PATH)
+
+
+def load() -> dict:
+    """
+    Manifest of all nodes, rebuilt in a child process whenever node sources changed
+    so the caller never runs node code
+    """
+
+    try:
+        with open(MANIFEST_PATH) as f:
+            manifest = json.load(f)
+
+        if manifest["sources"] == sources():
+            return manifest
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        pass
+
+    logger.info("Building node manifest")
+
+    (process := mp.Process(target=build)).start()
+    process.join()
+
+    if process.exitcode:
+        raise RuntimeError(
+            f"Building node manifest failed with code {process.exitcode}"
+        )
+
+    with open(MANIFEST_PATH) as f:
+        return json.load(f)
+
+
+def templates() -> dict[str, dict]:
+    """
+    Templates of all nodes, only blocking on a build if called before the API loaded
+    the manifest at startup
+    """
+
+    global _manifest
+
+    if _manifest is None:
+        _manifest = load()
+
+    return _manifest["templates"]
+
+
+def refresh(units: set[str]) -> set[str]:
+    """
+    Reloads the manifest after the given units changed, returning every node type
+    they defined before or define now
+    """
+
+    global _manifest
+
+    old = _manifest["units"] if _manifest else {}
+    _manifest = load()
+
+    return {
+        k
+        for k, unit in itertools.chain(old.items(), _manifest["units"].items())
+        if unit in units
+    }
@@ -10,6 +10,13 @@ from .components import Component
 nodes: dict[str, Node] = {}
 
 
+class Batch(list):
+    """
+    Per-item values of a batched output, split across downstream nodes that don't
+    accept the batch as a whole
+    """
+
+
 class Connection(BaseModel):
     name: str
     type: type = Field(exclude=True)
@@ -30,6 +37,9 @@ class NodeTemplate(BaseModel):
     inputs: dict[str, Connection] = {}
     outputs: dict[str, Connection] = {}
     values: dict[str, Value]
+    compile: set[str] = Field(set(), exclude=True)
+    cache: bool = Field(True, exclude=True)
+    batch: set[str] = Field(set(), exclude=True)
 
     @validator("inputs", "outputs", "values")
     def valid_ids(cls, value):
@@ -39,6 +49,24 @@ class NodeTemplate(BaseModel):
 
         return value
 
+    @validator("compile")
+    def valid_compile(cls, value, values):
+        if unknown := value - values.get("outputs", {}).keys():
+            raise ValueError(f"Cannot compile unknown outputs {unknown}")
+
+        return value
+
+    @validator("batch")
+    def valid_batch(cls, value, values):
+        if (
+            unknown := value
+            - values.get("inputs", {}).keys()
+            - values.get("values", {}).keys()
+        ):
+            raise ValueError(f"Cannot batch unknown parameters {unknown}")
+
+        return value
+
 
 class NodeMeta(type):
     def __new__(cls, name, bases, dict):
@@ -71,3 +99,36 @@ class Node(metaclass=NodeMeta):
     def values(self, values: dict):
         for k, v in values.items():
             setattr(self, f"_{k}", v)
+
+    def run(self, **inputs) -> dict:
+        """
+        Calls the node once per item of any batch received on an input it can't batch
+        over, and always returns its outputs as a dict
+        """
+
+        split = {
+            k: v
+            for k, v in inputs.items()
+            if isinstance(v, Batch) and k not in self.template.batch
+        }
+
+        if not split:
+            outputs = self(**inputs)
+
+            if not isinstance(outputs, dict):
+                outputs = {next(iter(self.template.outputs)): outputs}
+
+            return outputs
+
+        if len(sizes := {len(v) for v in split.values()}) > 1:
+            raise ValueError(f"Batched inputs have mismatched sizes {sizes}")
+
+        if not (size := sizes.pop()):
+            return {k: Batch() for k in self.template.outputs}
+
+        items = [
+            self.run(**{**inputs, **{k: v[i] for k, v in split.items()}})
+            for i in range(size)
+        ]
+
+        return {k: Batch(item[k] for item in items) for k in items[0]}
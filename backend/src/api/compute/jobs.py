@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import enum
+import heapq
+import itertools
+from collections import OrderedDict
+
+from pydantic import BaseModel
+
+
+@enum.unique
+class JobState(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUSPENDED = "suspended"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+WAITING = {JobState.QUEUED, JobState.SUSPENDED}
+
+
+class Job(BaseModel):
+    id: int
+    version: int
+    target: int | None
+    priority: int = 0
+    state: JobState = JobState.QUEUED
+    worker: str | None = None
+
+
+class JobQueue:
+    """
+    Priority queue of jobs, higher priorities first and FIFO among equals. Queueing
+    a graph version and target that is already waiting returns the waiting job
+    """
+
+    def __init__(self, history: int = 100):
+        self._heap: list[tuple[int, int, Job]] = []
+        self._jobs: dict[int, Job] = {}
+        self._keys: dict[int, set[str]] = {}
+        self._waiting: dict[tuple[int, int | None], Job] = {}
+        self._finished: OrderedDict[int, Job] = OrderedDict()
+        self._history = history
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._waiting)
+
+    def __iter__(self):
+        yield from self._jobs.values()
+
+    def get(self, id: int) -> Job | None:
+        return self._jobs.get(id) or self._finished.get(id)
+
+    def keys(self, id: int) -> set[str]:
+        return self._keys[id]
+
+    def push(
+        self, version: int, target: int | None, priority: int, keys: set[str]
+    ) -> Job:
+        if job := self._waiting.get((version, target)):
+            if priority > job.priority:
+                job.priority = priority
+                heapq.heappush(self._heap, (-priority, next(self._seq), job))
+
+            return job
+
+        job = Job(id=next(self._ids), version=version, target=target, priority=priority)
+
+        self._jobs[job.id] = job
+        self._keys[job.id] = keys
+        self._waiting[version, target] = job
+
+        heapq.heappush(self._heap, (-priority, next(self._seq), job))
+
+        return job
+
+    def peek(self) -> Job | None:
+        while self._heap:
+            priority, _, job = self._heap[0]
+
+            if job.state in WAITING and -priority == job.priority:
+                return job
+
+            heapq.heappop(self._heap)
+
+        return None
+
+    def pop(self) -> Job | None:
+        if job := self.peek():
+            heapq.heappop(self._heap)
+            self._unwait(job)
+
+            job.state = JobState.RUNNING
+
+        return job
+
+    def requeue(self, id: int):
+        job = self._jobs[id]
+        job.state = JobState.SUSPENDED
+
+        self._waiting.setdefault((job.version, job.target), job)
+        heapq.heappush(self._heap, (-job.priority, next(self._seq), job))
+
+    def cancel(self, id: int) -> Job | None:
+        if (job := self._jobs.get(id)) and job.state in WAITING:
+            self._unwait(job)
+            self.finish(id, JobState.CANCELLED)
+
+        return job
+
+    def _unwait(self, job: Job):
+        # a requeued job can share its key with a job queued while it was running
+        if self._waiting.get((job.version, job.target)) is job:
+            del self._waiting[job.version, job.target]
+
+    def finish(self, id: int, state: JobState):
+        job = self._jobs.pop(id)
+        job.state = state
+
+        del self._keys[id]
+
+        self._finished[id] = job
+        while len(self._finished) > self._history:
+            self._finished.popitem(last=False)
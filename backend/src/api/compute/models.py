@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import weakref
+from collections import OrderedDict
+from os import environ as env
+from typing import Any, Callable
+
+from .cache import sizeof
+
+
+class Lease:
+    def __init__(self, key: str, value: Any):
+        self.key = key
+        self.value = value
+
+
+class ModelRegistry:
+    """
+    Worker-wide store of loaded models deduplicated by identity. Models are handed out
+    through leases and only evicted, least recently used first, once no lease on them
+    is left and the byte budget is exceeded
+    """
+
+    def __init__(self, budget: int):
+        self._budget = budget
+        self._size = 0
+        self._entries: OrderedDict[str, list[Any, int, int]] = OrderedDict()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def keys(self):
+        return self._entries.keys()
+
+    def refs(self, key: str) -> int:
+        return self._entries[key][2]
+
+    def acquire(self, key: str, loader: Callable[[], Any]) -> Lease:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        else:
+            value = loader()
+            self._entries[key] = [value, size := sizeof(value), 0]
+            self._size += size
+
+        entry = self._entries[key]
+        entry[2] += 1
+
+        lease = Lease(key, entry[0])
+        weakref.finalize(lease, self._release, key)
+
+        self._evict()
+
+        return lease
+
+    def _release(self, key: str):
+        self._entries[key][2] -= 1
+
+        self._evict()
+
+    def _evict(self):
+        for key in [k for k, v in self._entries.items() if not v[2]]:
+            if self._size <= self._budget:
+                break
+
+            _, size, _ = self._entries.pop(key)
+            self._size -= size
+
+
+registry = ModelRegistry(int(env.get("MODEL_BUDGET", 16 * 2**30)))
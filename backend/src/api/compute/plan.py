@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import networkx as nx
+
+from . import graph
+
+
+class ExecutionPlan:
+    """
+    Topologically ordered component of a ComputeGraph with input wiring flattened to
+    indices into the order, so executing it never walks the graph
+    """
+
+    def __init__(self, graph_: graph.ComputeGraph, id: int | None = None):
+        subgraph = graph_.subgraph(graph_.component(id))
+
+        if not nx.is_directed_acyclic_graph(subgraph):
+            raise Exception("Graph contains cycle")
+
+        self.order: list[int] = list(nx.topological_sort(subgraph))
+
+        index = {n: i for i, n in enumerate(self.order)}
+
+        self.inputs: list[list[tuple[int, str, str]]] = [
+            [
+                (index[u], uh, vh)
+                for u in subgraph.predecessors(n)
+                for uh, vh in subgraph.edges[u, n]["map"]
+            ]
+            for n in self.order
+        ]
+
+        self.sinks: set[int] = {
+            index[n] for n in self.order if not subgraph.out_degree(n) or n == id
+        }
+
+    def __len__(self) -> int:
+        return len(self.order)
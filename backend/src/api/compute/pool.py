@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+from os import environ as env
+
+import logging
+import logging.config
+
+import api.utils as utils
+
+from . import graph
+from .executor import Executor, Device, Control, GraphAction, NodeReload, JobStatus
+from .jobs import Job, JobQueue, JobState, WAITING
+from .results import results
+from .resources import ResourceManager, resources
+
+logging.config.dictConfig(utils.LOGGING_CONFIG)
+logger = logging.getLogger(__name__)
+
+
+class ExecutorPool:
+    def __init__(
+        self,
+        executors: list[Executor],
+        preempt: bool = env.get("EXECUTOR_PREEMPT", "1") == "1",
+    ):
+        self._executors = executors
+        self._preempt = preempt
+        self._jobs = JobQueue()
+
+        for executor in self._executors:
+            executor.on_idle = self._on_idle
+
+    @classmethod
+    def from_devices(
+        cls, devices: list[Device], resources: ResourceManager = resources
+    ) -> ExecutorPool:
+        cpus = iter(range(len(devices)))
+        devices = [Device("cpu", next(cpus)) if d.type == "cpu" else d for d in devices]
+
+        assignments = resources.assign([str(d) for d in devices if d.type == "cpu"])
+
+        return cls([Executor(d, assignment=assignments.get(str(d))) for d in devices])
+
+    @property
+    def executors(self) -> list[Executor]:
+        return self._executors
+
+    @property
+    def jobs(self) -> JobQueue:
+        return self._jobs
+
+    async def __call__(self):
+        await asyncio.gather(*(executor() for executor in self._executors))
+
+    def enqueue(
+        self,
+        graph: graph.ComputeGraph,
+        version: int,
+        target: int | None = None,
+        priority: int = 0,
+    ) -> Job:
+        # the same work already running takes the request instead of a second job,
+        # unless it is being cancelled
+        for e in self._executors:
+            if (
+                e.job
+                and (e.job.version, e.job.target) == (version, target)
+                and e.control is not Control.CANCEL
+            ):
+                e.job.priority = max(e.job.priority, priority)
+                return e.job
+
+        job = self._jobs.push(
+            version,
+            target,
+            priority,
+            {graph.node_key(n) for n in graph.component(target)},
+        )
+
+        self._schedule()
+
+        return job
+
+    def cancel(self, id: int, force: bool = False) -> Job | None:
+        if (job := self._jobs.get(id)) and job.state in WAITING:
+            self._jobs.cancel(id)
+        elif job and job.state is JobState.RUNNING:
+            executor = next(e for e in self._executors if e.job is job)
+
+            if force:
+                executor.interrupt()
+            else:
+                executor.cancel()
+
+        return job
+
+    def update(self, version: int, func: str, kwargs: dict[str, Any]):
+        action = GraphAction(version=version, func=func, kwargs=kwargs)
+
+        for executor in self._executors:
+            executor.update(action)
+
+    def reload(self, version: int, units: set[str], types: set[str]):
+        reload = NodeReload(version=version, units=units, types=types)
+
+        for executor in self._executors:
+            executor.update(reload)
+
+    def _on_idle(self, executor: Executor, status: JobStatus):
+        if status.state is JobState.SUSPENDED:
+            self._jobs.requeue(status.id)
+            logger.info(f"Suspended job {status.id} on {executor.name}")
+        else:
+            self._jobs.finish(status.id, status.state)
+
+        self._schedule()
+
+    def _schedule(self):
+        while self._jobs and (idle := [e for e in self._executors if e.idle]):
+            keys = self._jobs.keys((job := self._jobs.pop()).id)
+
+            executor = max(idle, key=lambda e: len(keys & e.resident))
+            executor.enqueue(job)
+            job.worker = executor.name
+
+            logger.info(
+                f"Scheduled job {job.id} for node {job.target} on {executor.name} "
+                f"({len(keys & executor.resident)}/{len(keys)} nodes resident)"
+            )
+
+        if not self._preempt or not (job := self._jobs.peek()):
+            return
+
+        running = [e for e in self._executors if not e.idle]
+
+        if not running or any(e.control is Control.SUSPEND for e in running):
+            return
+
+        # a job already told to stop must not have that overwritten
+        if not (running := [e for e in running if e.control is Control.NONE]):
+            return
+
+        victim = min(running, key=lambda e: e.job.priority)
+
+        if victim.job.priority < job.priority:
+            victim.suspend()
+
+            logger.info(
+                f"Preempting job {victim.job.id} on {victim.name} for job {job.id}"
+            )
+
+    def pause(self):
+        for executor in self._executors:
+            executor.pause()
+
+    def resume(self):
+        for executor in self._executors:
+            executor.resume()
+
+    def interrupt(self):
+        for executor in self._executors:
+            executor.interrupt()
+
+    def cleanup(self):
+        for executor in self._executors:
+            executor.cleanup()
+
+        results.clear()
+
+
+executor = ExecutorPool.from_devices(
+    [Device.parse(d) for d in env.get("EXECUTOR_DEVICES", "cpu").split(",")]
+)
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import os
+import glob
+import re
+from os import environ as env
+
+from pydantic import BaseModel
+
+
+def parse_cpulist(cpulist: str) -> set[int]:
+    """
+    Cores of a Linux cpulist such as `0-3,8-11`
+    """
+
+    cores = set()
+
+    for part in filter(None, cpulist.strip().split(",")):
+        start, _, end = part.partition("-")
+        cores.update(range(int(start), int(end or start) + 1))
+
+    return cores
+
+
+class CoreAssignment(BaseModel):
+    worker: str
+    cores: set[int]
+    numa_nodes: set[int]
+    intra_op_threads: int
+    inter_op_threads: int
+
+    def apply(self):
+        """
+        Pins the calling process to its cores and sizes torch's thread pools to match,
+        must run before torch does any parallel work
+        """
+
+        os.sched_setaffinity(0, self.cores)
+        env["OMP_NUM_THREADS"] = str(self.intra_op_threads)
+
+        import torch
+
+        torch.set_num_threads(self.intra_op_threads)
+        torch.set_num_interop_threads(self.inter_op_threads)
+
+
+class ResourceManager:
+    """
+    Divides the cores available to the API between CPU workers so that no two share a
+    core, keeping each worker within a single NUMA node whenever there are at least as
+    many workers as nodes
+    """
+
+    def __init__(
+        self,
+        cores: set[int] | None = None,
+        reserved: int = int(env.get("EXECUTOR_RESERVED_CORES", 0)),
+        inter_op_threads: int = int(env.get("EXECUTOR_INTEROP_THREADS", 1)),
+    ):
+        cores = sorted(cores if cores is not None else os.sched_getaffinity(0))
+
+        if reserved >= len(cores):
+            raise ValueError(
+                f"Cannot reserve {reserved} of {len(cores)} cores for the API"
+            )
+
+        self._cores = set(cores[reserved:])
+        self._inter_op_threads = inter_op_threads
+        self._assignments: dict[str, CoreAssignment] = {}
+
+    @property
+    def cores(self) -> set[int]:
+        return self._cores
+
+    @property
+    def assignments(self) -> dict[str, CoreAssignment]:
+        return self._assignments
+
+    def numa_nodes(self) -> dict[int, list[int]]:
+        """
+        Available cores grouped by NUMA node, a single node when the topology is unknown
+        """
+
+        nodes = {}
+
+        for path in glob.glob("/sys/devices/system/node/node*/cpulist"):
+            with open(path) as f:
+                if cores := sorted(parse_cpulist(f.read()) & self._cores):
+                    nodes[int(re.search(r"node(\d+)", path)[1])] = cores
+
+        if sum(map(len, nodes.values())) != len(self._cores):
+            return {0: sorted(self._cores)}
+
+        return dict(sorted(nodes.items()))
+
+    def assign(self, workers: list[str]) -> dict[str, CoreAssignment]:
+        if len(workers) > len(self._cores):
+            raise ValueError(
+                f"Cannot divide {len(self._cores)} cores between {len(workers)} workers"
+            )
+
+        nodes = self.numa_nodes()
+        groups: list[tuple[set[int], list[int]]] = []
+
+        if len(workers) <= len(nodes):
+            # whole nodes per worker
+            ids = list(nodes)
+            for i in range(len(workers)):
+                n, r = divmod(len(ids), len(workers))
+                start = i * n + min(i, r)
+                part = ids[start : start + n + (i < r)]
+
+                groups.append((set(part), [c for p in part for c in nodes[p]]))
+        else:
+            # workers per node by the cores each would get, then even splits
+            counts = {k: 0 for k in nodes}
+            for _ in workers:
+                counts[
+                    max(
+                        (k for k in nodes if counts[k] < len(nodes[k])),
+                        key=lambda k: len(nodes[k]) / (counts[k] + 1),
+                    )
+                ] += 1
+
+            for k, count in counts.items():
+                for i in range(count):
+                    n, r = divmod(len(nodes[k]), count)
+                    start = i * n + min(i, r)
+
+                    groups.append(({k}, nodes[k][start : start + n + (i < r)]))
+
+        self._assignments = {
+            worker: CoreAssignment(
+                worker=worker,
+                cores=set(cores),
+                numa_nodes=numa_nodes,
+                intra_op_threads=len(cores),
+                inter_op_threads=self._inter_op_threads,
+            )
+            for worker, (numa_nodes, cores) in zip(workers, groups)
+        }
+
+        return self._assignments
+
+
+resources = ResourceManager(
+    parse_cpulist(env["EXECUTOR_CORES"]) if "EXECUTOR_CORES" in env else None
+)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from multiprocessing import shared_memory, resource_tracker
+
+from PIL import Image
+from pydantic import BaseModel
+
+
+class ResultHandle(BaseModel):
+    name: str
+    job: int
+    node: int
+    output: str
+    kind: str
+    dtype: str
+    shape: list[int]
+    size: int
+
+
+def share(job: int, node: int, output: str, value) -> ResultHandle | None:
+    """
+    Copies a tensor or image output into a new shared memory segment whose ownership
+    passes to whoever receives the returned handle
+    """
+
+    import torch
+
+    match value:
+        case torch.Tensor():
+            kind, dtype = "tensor", str(value.dtype).removeprefix("torch.")
+            shape = list(value.shape)
+            data = value.detach().cpu().contiguous().view(-1).view(torch.uint8)
+        case Image.Image():
+            kind, dtype = "image", value.mode
+            shape = [value.height, value.width]
+            data = torch.frombuffer(bytearray(value.tobytes()), dtype=torch.uint8)
+        case _:
+            return None
+
+    shm = shared_memory.SharedMemory(create=True, size=max(data.numel(), 1))
+    torch.frombuffer(shm.buf, dtype=torch.uint8, count=data.numel()).copy_(data)
+
+    resource_tracker.unregister(shm._name, "shared_memory")
+    shm.close()
+
+    return ResultHandle(
+        name=shm.name,
+        job=job,
+        node=node,
+        output=output,
+        kind=kind,
+        dtype=dtype,
+        shape=shape,
+        size=data.numel(),
+    )
+
+
+class SharedResult:
+    def __init__(self, handle: ResultHandle):
+        self.handle = handle
+
+        self._shm = shared_memory.SharedMemory(handle.name)
+        self._readers = 0
+        self._retired = False
+
+    def __enter__(self) -> memoryview:
+        """
+        Views into the segment must be released before leaving the context
+        """
+
+        self._readers += 1
+
+        return self._shm.buf[: self.handle.size]
+
+    def __exit__(self, *_):
+        self._readers -= 1
+
+        if self._retired and not self._readers:
+            self._shm.close()
+
+    def retire(self):
+        """
+        Unlinks the segment right away but keeps it mapped until the last reader is
+        done with it
+        """
+
+        self._retired = True
+        self._shm.unlink()
+
+        if not self._readers:
+            self._shm.close()
+
+
+class ResultStore:
+    def __init__(self):
+        self._results: dict[tuple[int, str], SharedResult] = {}
+
+    def __iter__(self):
+        yield from (r.handle for r in self._results.values())
+
+    def get(self, node: int, output: str) -> SharedResult | None:
+        return self._results.get((node, output))
+
+    def put(self, handle: ResultHandle):
+        if old := self._results.get((handle.node, handle.output)):
+            old.retire()
+
+        self._results[handle.node, handle.output] = SharedResult(handle)
+
+    def discard(self, node: int):
+        for key in [k for k in self._results if k[0] == node]:
+            self._results.pop(key).retire()
+
+    def clear(self):
+        for result in self._results.values():
+            result.retire()
+
+        self._results.clear()
+
+
+results = ResultStore()
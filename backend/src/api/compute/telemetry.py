@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import enum
+import resource
+from collections import Counter, defaultdict
+
+from pydantic import BaseModel
+
+from .jobs import JobState
+
+
+@enum.unique
+class NodeStage(str, enum.Enum):
+    START = "start"
+    END = "end"
+
+
+@enum.unique
+class CacheStatus(str, enum.Enum):
+    HIT = "hit"
+    MISS = "miss"
+
+
+class NodeEvent(BaseModel):
+    worker: str | None = None
+    job: int
+    node: int
+    type: str
+    stage: NodeStage
+    cache: CacheStatus
+    time: float = 0.0
+    rss: int = 0
+    bytes: int = 0
+    failed: bool = False
+
+
+def peak_rss() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Metrics:
+    """
+    Aggregates worker telemetry into counters rendered in the Prometheus text format
+    """
+
+    def __init__(self):
+        self._nodes: Counter[tuple[str, CacheStatus]] = Counter()
+        self._failures: Counter[str] = Counter()
+        self._seconds: defaultdict[str, float] = defaultdict(float)
+        self._bytes: Counter[str] = Counter()
+        self._rss: dict[str, int] = {}
+        self._jobs: Counter[tuple[str, JobState]] = Counter()
+
+    def record_node(self, event: NodeEvent):
+        if event.stage is not NodeStage.END:
+            return
+
+        self._nodes[event.type, event.cache] += 1
+        self._failures[event.type] += event.failed
+        self._seconds[event.type] += event.time
+        self._bytes[event.type] += event.bytes
+        self._rss[event.worker] = max(self._rss.get(event.worker, 0), event.rss)
+
+    def record_job(self, worker: str, state: JobState):
+        self._jobs[worker, state] += 1
+
+    def render(self) -> str:
+        lines = []
+
+        def metric(name: str, kind: str, help: str, samples: dict):
+            lines.append(f"# HELP flowui_{name} {help}")
+            lines.append(f"# TYPE flowui_{name} {kind}")
+            for labels, value in samples.items():
+                labels = ",".join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"flowui_{name}{{{labels}}} {value}")
+
+        metric(
+            "node_executions_total",
+            "counter",
+            "Node evaluations by node type and cache result",
+            {(("type", t), ("cache", c.value)): n for (t, c), n in self._nodes.items()},
+        )
+        metric(
+            "node_failures_total",
+            "counter",
+            "Node evaluations that raised an exception",
+            {(("type", t),): n for t, n in self._failures.items()},
+        )
+        metric(
+            "node_seconds_total",
+            "counter",
+            "Wall time spent executing nodes",
+            {(("type", t),): n for t, n in self._seconds.items()},
+        )
+        metric(
+            "node_output_bytes_total",
+            "counter",
+            "Tensor bytes produced by executed nodes",
+            {(("type", t),): n for t, n in self._bytes.items()},
+        )
+        metric(
+            "worker_peak_rss_bytes",
+            "gauge",
+            "Peak resident set size of each worker",
+            {(("worker", w),): n for w, n in self._rss.items()},
+        )
+        metric(
+            "jobs_total",
+            "counter",
+            "Finished jobs by worker and final state",
+            {
+                (("worker", w), ("state", s.value)): n
+                for (w, s), n in self._jobs.items()
+            },
+        )
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
@@ -1,2 +1,5 @@
 from .graph import router as graph
 from .files import router as files
+from .jobs import router as jobs
+from .metrics import router as metrics
+from .executor import router as executor
@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+
+import api.compute as compute
+
+router = APIRouter(prefix="/executor", tags=["executor"])
+
+
+@router.get("/workers")
+def read_workers() -> list[compute.CoreAssignment]:
+    return list(compute.resources.assignments.values())
@@ -1,14 +1,21 @@
 from __future__ import annotations
 
+import io
+import copy
 import enum
+import asyncio
 from typing import Callable, Any, ForwardRef
-from pydantic import BaseModel, Field, create_model
+from collections import deque
+from os import environ as env
+from pydantic import BaseModel, Field, create_model, validator
 from pydantic.main import ModelMetaclass
 
 import logging
 import logging.config
 
-from fastapi import APIRouter, WebSocket
+from fastapi import APIRouter, WebSocket, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from PIL import Image
 
 import api.utils as utils
 import api.services as services
@@ -19,6 +26,17 @@ import api.compute.graph as graph
 compute_graph = graph.ComputeGraph()
 graph_version = 1
 
+RESULT_CHUNK_SIZE = 2**20
+
+# seconds position updates are merged for before they are broadcast
+COALESCE_WINDOW = float(env.get("GRAPH_COALESCE_WINDOW", 0.05))
+
+# merged position updates by the client that sent them
+pending_positions: dict[WebSocket, dict[int, dict[str, int]]] = {}
+
+# most recent broadcast actions, replayed to clients that missed some
+oplog: deque[dict] = deque(maxlen=int(env.get("GRAPH_OPLOG_SIZE", 1024)))
+
 logging.config.dictConfig(utils.LOGGING_CONFIG)
 logger = logging.getLogger(__name__)
 
@@ -31,17 +49,92 @@ async def read_graph():
         "version": graph_version,
         "nodes": list(compute_graph.convert_nodes()),
         "edges": list(compute_graph.convert_edges()),
-        "templates": {k: v.template.dict() for k, v in graph.node.nodes.items()},
+        "templates": graph.manifest.templates(),
     }
 
 
+@router.get("/actions")
+async def read_actions(since: int):
+    """
+    Actions after a version for clients to catch up with, as long as they are kept
+    """
+
+    actions = [a for a in oplog if a["version"] > since]
+
+    if since > graph_version or (actions and actions[0]["version"] - 1 > since):
+        raise HTTPException(
+            status_code=410, detail=f"Actions since version {since} are not kept"
+        )
+
+    return {"version": graph_version, "actions": actions}
+
+
 class GraphQueue(BaseModel):
     id: int | None
+    priority: int = 0
 
 
 @router.post("/queue")
-async def queue_job(queue: GraphQueue):
-    compute.executor.enqueue(compute_graph, id=queue.id)
+async def queue_job(queue: GraphQueue) -> compute.Job:
+    if queue.id is not None and queue.id not in compute_graph:
+        raise HTTPException(status_code=404, detail=f"No node {queue.id} in the graph")
+
+    return compute.executor.enqueue(
+        compute_graph, graph_version, target=queue.id, priority=queue.priority
+    )
+
+
+@router.get("/results")
+async def read_results() -> list[compute.ResultHandle]:
+    return list(compute.results)
+
+
+@router.get("/results/{node}/{output}")
+def read_result(node: int, output: str):
+    if not (result := compute.results.get(node, output)):
+        raise HTTPException(
+            status_code=404, detail=f"No result for output '{output}' of node {node}"
+        )
+
+    handle = result.handle
+
+    if handle.kind == "image":
+        with result as buf:
+            try:
+                image = Image.frombuffer(
+                    handle.dtype,
+                    tuple(handle.shape[::-1]),
+                    buf,
+                    "raw",
+                    handle.dtype,
+                    0,
+                    1,
+                )
+                image.save(png := io.BytesIO(), format="PNG")
+
+                del image
+            finally:
+                buf.release()
+
+        return Response(content=png.getvalue(), media_type="image/png")
+
+    def stream():
+        with result as buf:
+            # also released when the client disconnects mid-download
+            try:
+                for i in range(0, len(buf), RESULT_CHUNK_SIZE):
+                    yield bytes(buf[i : i + RESULT_CHUNK_SIZE])
+            finally:
+                buf.release()
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/octet-stream",
+        headers={
+            "X-Dtype": handle.dtype,
+            "X-Shape": ",".join(map(str, handle.shape)),
+        },
+    )
 
 
 actions: dict[str, Schema] = {}
@@ -78,6 +171,13 @@ class CreateNode(Schema):
     position: create_model("Position", x=(int, ...), y=(int, ...))
     values: dict[str, Any]
 
+    @validator("type")
+    def type_exists(cls, type):
+        if type not in graph.manifest.templates():
+            raise ValueError(f"Unknown node type '{type}'")
+
+        return type
+
 
 class DeleteNode(Schema):
     _func = "remove_node"
@@ -115,24 +215,142 @@ class DeleteEdge(Schema):
     id: str
 
 
+class Batch(Schema):
+    actions: list[dict[str, Any]]
+
+    @validator("actions", each_item=True)
+    def valid_action(cls, action, values):
+        if (name := action.get("action")) not in actions or name == "batch":
+            raise ValueError(f"Invalid batched action '{name}'")
+
+        return actions[name](**{**action, "version": values.get("version", 0)})
+
+
 class GraphUpdate(Schema):
     def __new__(cls, action: str, *args, **kwargs):
         return actions[action](*args, action=action, **kwargs)
 
 
+def record(action: dict | Schema) -> dict:
+    oplog.append(action := action if type(action) is dict else action.dict())
+
+    return action
+
+
+async def broadcast_positions():
+    """
+    Sends the position updates merged during the window to every client but their
+    sender, as a batch outside of the versioned actions
+    """
+
+    await asyncio.sleep(COALESCE_WINDOW)
+
+    pending = dict(pending_positions)
+    pending_positions.clear()
+
+    for websocket, positions in pending.items():
+        await services.websocket_handler.broadcast(
+            "graph",
+            {
+                "version": graph_version,
+                "action": "batch",
+                "actions": [
+                    {"action": "updatePositionNode", "id": id, "position": position}
+                    for id, position in positions.items()
+                ],
+            },
+            exclude=websocket,
+        )
+
+
 @services.websocket_handler.on_message("graph")
 @services.websocket_handler.broadcast_func("graph")
-def handle_graph_updates(item: GraphUpdate):
-    global graph_version
+def handle_graph_updates(item: GraphUpdate, websocket: WebSocket):
+    global graph_version, compute_graph
+
+    items: list[Schema] = item.actions if isinstance(item, Batch) else [item]
+
+    if all(isinstance(i, UpdatePositionNode) for i in items):
+        # positions commute with every other action, so they are taken at any
+        # version and never advance it, nodes deleted meanwhile are skipped
+        scheduled = bool(pending_positions)
+
+        for i in items:
+            if i.id in compute_graph:
+                compute_graph.update_position_node(i.id, i.position.dict())
+
+                pending_positions.setdefault(websocket, {})[i.id] = i.position.dict()
+
+        if pending_positions and not scheduled:
+            asyncio.create_task(broadcast_positions())
+
+        return
 
     if item.version != graph_version:
-        return {"action": "syncGraph"}
+        # the sender already applied the rejected action locally
+        services.websocket_handler.send(websocket, "graph", {"action": "syncGraph"})
+        return
+
+    # applied to a copy so a failing action leaves the graph untouched
+    graph_ = copy.deepcopy(compute_graph) if len(items) > 1 else compute_graph
+
+    updates = []
+    try:
+        for i in items:
+            kwargs = {
+                k: v for k, v in i.dict().items() if k not in {"version", "action"}
+            }
+
+            graph_.__getattribute__(i._func)(**kwargs)
+
+            # workers have no use for positions, the next action carries the version
+            if not isinstance(i, UpdatePositionNode):
+                updates.append((i._func, kwargs))
+    except Exception:
+        logger.exception(f"Rejected graph action '{item.action}'")
+
+        # the copy is dropped, the sender already applied the action locally
+        services.websocket_handler.send(websocket, "graph", {"action": "syncGraph"})
+        return
+
+    compute_graph = graph_
 
     graph_version += 1
     item.version = graph_version
 
-    compute_graph.__getattribute__(item._func)(
-        **{k: v for k, v in item.dict().items() if k not in {"version", "action"}}
-    )
+    for i in items:
+        i.version = graph_version
 
-    return item
+    for func, kwargs in updates:
+        compute.executor.update(graph_version, func, kwargs)
+
+    for i in items:
+        if isinstance(i, DeleteNode):
+            compute.results.discard(i.id)
+
+    yield record(item)
+
+
+@services.file_watcher.on_change(graph.loader.nodes_path)
+async def handle_node_changes(paths: set[str]):
+    global graph_version
+
+    if not (units := {graph.loader.unit(p) for p in paths} - {None}):
+        return
+
+    try:
+        types = await asyncio.to_thread(graph.manifest.refresh, units)
+    except Exception:
+        logger.exception(f"Reloading nodes from {units} failed")
+        return
+
+    graph_version += 1
+
+    compute_graph.invalidate_types(types)
+    compute.executor.reload(graph_version, units, types)
+
+    logger.info(f"Reloaded nodes from {units}, invalidated types {types}")
+
+    await services.websocket_handler.broadcast(
+        "graph", record({"version": graph_version, "action": "reloadNodes"})
+    )
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, HTTPException
+
+import api.compute as compute
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("/")
+def read_jobs() -> list[compute.Job]:
+    return list(compute.executor.jobs)
+
+
+@router.get("/{id}")
+def read_job(id: int) -> compute.Job:
+    if not (job := compute.executor.jobs.get(id)):
+        raise HTTPException(status_code=404, detail=f"Job {id} does not exist")
+
+    return job
+
+
+@router.delete("/{id}")
+def cancel_job(id: int, force: bool = False) -> compute.Job:
+    if not (job := compute.executor.cancel(id, force=force)):
+        raise HTTPException(status_code=404, detail=f"Job {id} does not exist")
+
+    return job
@@ -1,5 +1,6 @@
 import os
 import asyncio
+from typing import Callable
 
 from os import environ as env
 from watchfiles import awatch
@@ -10,17 +11,49 @@ from .websocket import websocket_handler
 class FileWatcher:
     def __init__(self):
         self._stop_event = asyncio.Event()
+        self._on_change: dict[str, list[Callable]] = dict()
 
         self.dir_structure = self._read_dir(os.path.normpath(env["DATA_DIR"]))
 
     async def __call__(self):
-        async for _ in awatch(env["DATA_DIR"], stop_event=self._stop_event):
+        async for changes in awatch(env["DATA_DIR"], stop_event=self._stop_event):
             self.dir_structure = self._read_dir(os.path.normpath(env["DATA_DIR"]))
-            await websocket_handler.broadcast("files", self.dir_structure)
+            await websocket_handler.broadcast("files", self.dir_structure, key="tree")
+
+            for dir, funcs in self._on_change.items():
+                if not (
+                    paths := {
+                        path
+                        for _, path in changes
+                        if os.path.commonpath([dir, path]) == dir
+                    }
+                ):
+                    continue
+
+                for func in funcs:
+                    if asyncio.iscoroutinefunction(func):
+                        await func(paths)
+                    else:
+                        func(paths)
 
     def stop(self):
         self._stop_event.set()
 
+    def on_change(self, dir: str):
+        """
+        Registers a function called with the set of changed paths under a directory
+        """
+
+        def decorator(func):
+            if (dir_ := os.path.abspath(dir)) in self._on_change:
+                self._on_change[dir_].append(func)
+            else:
+                self._on_change[dir_] = [func]
+
+            return func
+
+        return decorator
+
     @staticmethod
     def _read_dir(path: str):
         return {
@@ -1,22 +1,111 @@
+import json
+import base64
 import inspect
 import asyncio
+import itertools
 import functools
+from collections import OrderedDict
+from os import environ as env
 
-from typing import get_type_hints, Any
+from typing import get_type_hints, Any, Callable, Hashable, NamedTuple
 
+import msgpack
 from fastapi import WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
 
+# subprotocols a client can offer to pick the message encoding, JSON without one
+ENCODINGS = ("msgpack", "json")
+
 
 class WebSocketMsg(BaseModel):
     stream: str
     data: dict[str, Any]
 
 
+class Handler(NamedTuple):
+    func: Callable
+    models: dict[str, type[BaseModel]]
+    websockets: tuple[str, ...]
+    coroutine: bool
+
+    @classmethod
+    def compile(cls, func: Callable) -> "Handler":
+        """
+        Resolves which arguments of a message handler are built as models from the
+        message and which receive the websocket, so dispatching needs no reflection
+        """
+
+        typehints = get_type_hints(func)
+        typehints.pop("return", None)
+
+        return cls(
+            func,
+            {
+                k: v
+                for k, v in typehints.items()
+                if isinstance(v, type) and issubclass(v, BaseModel)
+            },
+            tuple(k for k, v in typehints.items() if v is WebSocket),
+            asyncio.iscoroutinefunction(func),
+        )
+
+    def __call__(self, data: dict[str, Any], websocket: WebSocket):
+        kwargs = dict(data)
+
+        for k, model in self.models.items():
+            kwargs[k] = model(**data[k])
+
+        for k in self.websockets:
+            kwargs[k] = websocket
+
+        return self.func(**kwargs)
+
+
+class Outbox:
+    """
+    Bounded queue of encoded messages to one client. A message with a merge key
+    replaces the queued message with the same key, and once full the oldest message
+    is dropped, so a slow client only ever falls behind by the queue size
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._messages: OrderedDict[tuple, str | bytes] = OrderedDict()
+        self._seq = itertools.count()
+        self._ready = asyncio.Event()
+
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def put(self, message: str | bytes, key: Hashable | None = None):
+        if key is not None and (key := ("key", key)) in self._messages:
+            self._messages[key] = message
+            return
+
+        if len(self._messages) >= self._size:
+            self._messages.popitem(last=False)
+            self.dropped += 1
+
+        self._messages[key or ("seq", next(self._seq))] = message
+        self._ready.set()
+
+    async def get(self) -> str | bytes:
+        while not self._messages:
+            self._ready.clear()
+            await self._ready.wait()
+
+        return self._messages.popitem(last=False)[1]
+
+
 class WebSocketHandler:
-    def __init__(self):
+    def __init__(self, queue_size: int = int(env.get("WEBSOCKET_QUEUE_SIZE", 256))):
+        self._queue_size = queue_size
         self._active: dict[WebSocket, set[str]] = dict()
-        self._on_message: dict[str, list[function]] = dict()
+        self._outboxes: dict[WebSocket, Outbox] = dict()
+        self._encodings: dict[WebSocket, str] = dict()
+        self._on_message: dict[str, list[Handler]] = dict()
 
         @self.on_message("streams")
         def _(streams, action, websocket: WebSocket):
@@ -33,62 +122,130 @@ class WebSocketHandler:
                 del self._active[websocket]
 
     async def listen(self, websocket: WebSocket):
-        await websocket.accept()
+        encoding = next(
+            (p for p in websocket.scope.get("subprotocols", []) if p in ENCODINGS),
+            None,
+        )
+
+        await websocket.accept(subprotocol=encoding)
+
+        self._encodings[websocket] = encoding or "json"
+
+        self._outboxes[websocket] = outbox = Outbox(self._queue_size)
+        sender = asyncio.create_task(self.drain(websocket, outbox))
+
         try:
             while True:
                 await self.receive(websocket)
         except WebSocketDisconnect:
+            pass
+        finally:
+            # also forgets sockets torn down by an exception
             self.disconnect(websocket)
+            sender.cancel()
 
     def disconnect(self, websocket: WebSocket):
         if websocket in self._active:
             del self._active[websocket]
 
-    async def broadcast(self, stream: str, data: dict | BaseModel):
-        await asyncio.gather(
-            *[
-                k.send_json(
-                    {
-                        "stream": stream,
-                        "data": data if type(data) is dict else data.dict(),
-                    }
-                )
-                for k, v in self._active.items()
-                if stream in v
-            ]
+        self._outboxes.pop(websocket, None)
+        self._encodings.pop(websocket, None)
+
+    async def drain(self, websocket: WebSocket, outbox: Outbox):
+        try:
+            while True:
+                if isinstance(message := await outbox.get(), bytes):
+                    await websocket.send_bytes(message)
+                else:
+                    await websocket.send_text(message)
+        except Exception:
+            # the receiving side notices the disconnect and cleans up
+            pass
+
+    async def broadcast(
+        self,
+        stream: str,
+        data: dict | BaseModel,
+        key: Hashable | None = None,
+        exclude: WebSocket | None = None,
+    ):
+        """
+        Encodes a message once per encoding in use and queues it for every subscriber
+        of the stream but the excluded one, a merge key marks messages that supersede
+        earlier ones with the same key
+        """
+
+        messages: dict[str, str | bytes] = {}
+
+        for websocket, streams in self._active.items():
+            if (
+                stream not in streams
+                or websocket not in self._outboxes
+                or websocket is exclude
+            ):
+                continue
+
+            if (encoding := self._encodings[websocket]) not in messages:
+                messages[encoding] = self.encode(stream, data, encoding)
+
+            self._outboxes[websocket].put(
+                messages[encoding], key=(stream, key) if key is not None else None
+            )
+
+    def send(self, websocket: WebSocket, stream: str, data: dict | BaseModel):
+        """
+        Queues a message for a single client
+        """
+
+        if (outbox := self._outboxes.get(websocket)) is not None:
+            outbox.put(self.encode(stream, data, self._encodings[websocket]))
+
+    @staticmethod
+    def encode(stream: str, data: dict | BaseModel, encoding: str) -> str | bytes:
+        """
+        Binary data is sent as is with msgpack and base64 encoded with JSON
+        """
+
+        msg = {"stream": stream, "data": data if type(data) is dict else data.dict()}
+
+        def default(obj):
+            match obj:
+                case set() | frozenset():
+                    return list(obj)
+                case bytes() if encoding == "json":
+                    return base64.b64encode(obj).decode()
+
+            raise TypeError(f"Cannot encode {type(obj).__name__}")
+
+        if encoding == "msgpack":
+            return msgpack.packb(msg, default=default)
+
+        return json.dumps(
+            msg, default=default, separators=(",", ":"), ensure_ascii=False
         )
 
     async def receive(self, websocket: WebSocket):
-        msg = WebSocketMsg(**(await websocket.receive_json()))
+        if self._encodings[websocket] == "msgpack":
+            msg = WebSocketMsg(**msgpack.unpackb(await websocket.receive_bytes()))
+        else:
+            msg = WebSocketMsg(**(await websocket.receive_json()))
 
         asyncs = []
 
-        for func in self._on_message[msg.stream]:
-            typehints = get_type_hints(func)
-
-            kwargs = {
-                **msg.data,
-                **{
-                    k: v(**msg.data[k])
-                    for k, v in typehints.items()
-                    if issubclass(v, BaseModel)
-                },
-                **{k: websocket for k, v in typehints.items() if v is WebSocket},
-            }
-
-            if asyncio.iscoroutinefunction(func):
-                asyncs.append(func(**kwargs))
+        for handler in self._on_message[msg.stream]:
+            if handler.coroutine:
+                asyncs.append(handler(msg.data, websocket))
             else:
-                func(**kwargs)
+                handler(msg.data, websocket)
 
         await asyncio.gather(*asyncs)
 
     def on_message(self, stream: str):
         def decorator(func):
             if stream in self._on_message:
-                self._on_message[stream].append(func)
+                self._on_message[stream].append(Handler.compile(func))
             else:
-                self._on_message[stream] = [func]
+                self._on_message[stream] = [Handler.compile(func)]
 
             return func
 
@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# read when the api package is imported, node code is left empty
+os.environ.setdefault("API_ENV", "development")
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp())
+
+os.makedirs(os.path.join(os.environ["DATA_DIR"], "nodes"), exist_ok=True)
@@ -0,0 +1,39 @@
+import torch
+
+from api.compute.cache import NodeCache
+
+
+def entry(size: int) -> dict:
+    return {"out": torch.zeros(size, dtype=torch.uint8)}
+
+
+def test_evicts_least_recently_used_over_budget():
+    cache = NodeCache(25)
+
+    cache.put("a", entry(10))
+    cache.put("b", entry(10))
+    cache.get("a")
+    cache.put("c", entry(10))
+
+    assert set(cache.keys()) == {"a", "c"}
+    assert cache.size == 20
+
+
+def test_skips_values_larger_than_budget():
+    cache = NodeCache(25)
+
+    cache.put("a", entry(10))
+    cache.put("b", entry(30))
+
+    assert set(cache.keys()) == {"a"}
+    assert cache.size == 10
+
+
+def test_replacing_entry_updates_size():
+    cache = NodeCache(25)
+
+    cache.put("a", entry(10))
+    cache.put("a", entry(5))
+
+    assert len(cache) == 1
+    assert cache.size == 5
@@ -0,0 +1,81 @@
+import threading
+import multiprocessing as mp
+
+from api.compute.executor import (
+    Control,
+    Device,
+    GraphAction,
+    IPCMessage,
+    JobStatus,
+    process,
+)
+from api.compute.graph import Node, NodeTemplate
+from api.compute.jobs import Job, JobState
+
+
+class FailingNode(Node):
+    template = NodeTemplate(values={}, outputs={"out": {"name": "Out", "type": int}})
+
+    def __call__(self):
+        raise RuntimeError("node failed")
+
+
+def run(*msgs) -> list:
+    """
+    Feeds messages to a worker running in a thread and collects what it reports
+    until every job finished
+    """
+
+    queue = mp.Queue()
+    recv, send = mp.Pipe(duplex=False)
+    shutdown = mp.Event()
+    control = mp.Value("i", Control.NONE)
+
+    worker = threading.Thread(
+        target=process,
+        args=(Device("cpu"), queue, send, shutdown, control, 2**20, None, None),
+    )
+    worker.start()
+
+    for msg in msgs:
+        queue.put(msg)
+
+    received = []
+    jobs = sum(isinstance(msg, Job) for msg in msgs)
+
+    while sum(isinstance(r, JobStatus) for r in received) < jobs:
+        assert recv.poll(30), f"worker stopped reporting after {received}"
+        received.append(recv.recv())
+
+    shutdown.set()
+    queue.put(GraphAction(version=0, func="clear", kwargs={}))
+    worker.join(30)
+
+    assert not worker.is_alive()
+
+    return received
+
+
+def test_failing_node_and_stale_job_keep_worker_alive():
+    received = run(
+        GraphAction(
+            version=2,
+            func="add_node",
+            kwargs={"id": 0, "type": "FailingNode", "values": {}, "position": {}},
+        ),
+        Job(id=1, version=1, target=0),
+        Job(id=2, version=2, target=0),
+    )
+
+    statuses = [r for r in received if isinstance(r, JobStatus)]
+    messages = [r for r in received if isinstance(r, IPCMessage)]
+
+    assert [(s.id, s.state) for s in statuses] == [
+        (1, JobState.FAILED),
+        (2, JobState.FAILED),
+    ]
+    assert [m.type for m in messages] == [
+        IPCMessage.Type.WARNING,
+        IPCMessage.Type.ERROR,
+        IPCMessage.Type.ERROR,
+    ]
@@ -0,0 +1,44 @@
+import sys
+import asyncio
+
+import api.routers
+from api.compute.graph import ComputeGraph
+from api.services import websocket_handler
+from api.services.websocket import Outbox
+
+graph_router = sys.modules["api.routers.graph"]
+
+
+def test_failing_batch_is_rejected_with_sync(monkeypatch):
+    compute_graph = ComputeGraph()
+    for id in range(2):
+        compute_graph.add_node(id, "Stub", {}, {"x": 0, "y": 0})
+    compute_graph.add_edge("e0out-1in", 0, 1, "out", "in")
+
+    monkeypatch.setattr(graph_router, "compute_graph", compute_graph)
+    monkeypatch.setattr(graph_router, "graph_version", 3)
+
+    websocket = object()
+    outbox = Outbox(8)
+    monkeypatch.setitem(websocket_handler._outboxes, websocket, outbox)
+    monkeypatch.setitem(websocket_handler._encodings, websocket, "json")
+
+    asyncio.run(
+        graph_router.handle_graph_updates(
+            item=graph_router.GraphUpdate(
+                version=3,
+                action="batch",
+                actions=[
+                    {"action": "deleteNode", "id": 1},
+                    {"action": "deleteEdge", "id": "e0out-1in"},
+                ],
+            ),
+            websocket=websocket,
+        )
+    )
+
+    assert graph_router.compute_graph is compute_graph
+    assert set(compute_graph.nodes) == {0, 1}
+    assert graph_router.graph_version == 3
+    assert len(outbox) == 1
+    assert '"syncGraph"' in asyncio.run(outbox.get())
@@ -0,0 +1,34 @@
+from api.compute.jobs import JobQueue, JobState
+
+
+def test_requeue_alongside_waiting_job():
+    jobs = JobQueue()
+
+    a = jobs.push(5, 1, 0, set())
+    assert jobs.pop() is a
+
+    b = jobs.push(5, 1, 5, set())
+    assert b is not a
+
+    jobs.requeue(a.id)
+
+    assert jobs.pop() is b
+    assert jobs.pop() is a
+    assert jobs.pop() is None
+    assert len(jobs) == 0
+
+
+def test_cancel_requeued_job_keeps_waiting_job():
+    jobs = JobQueue()
+
+    a = jobs.push(5, 1, 0, set())
+    jobs.pop()
+
+    b = jobs.push(5, 1, 5, set())
+    jobs.requeue(a.id)
+    jobs.cancel(a.id)
+
+    assert a.state is JobState.CANCELLED
+    assert jobs.push(5, 1, 0, set()) is b
+    assert jobs.pop() is b
+    assert jobs.pop() is None
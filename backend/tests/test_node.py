@@ -0,0 +1,23 @@
+from api.compute.graph import Batch, Node, NodeTemplate
+
+
+class DoubleNode(Node):
+    template = NodeTemplate(
+        inputs={"x": {"name": "X", "type": int}},
+        outputs={"out": {"name": "Out", "type": int}},
+        values={},
+    )
+
+    def __call__(self, x):
+        return x * 2
+
+
+def test_run_maps_over_batch():
+    assert DoubleNode({}, {}).run(x=Batch([1, 2])) == {"out": [2, 4]}
+
+
+def test_run_empty_batch():
+    outputs = DoubleNode({}, {}).run(x=Batch())
+
+    assert outputs == {"out": []}
+    assert isinstance(outputs["out"], Batch)
@@ -0,0 +1,48 @@
+import pytest
+
+from api.compute.graph import ComputeGraph
+from api.compute.plan import ExecutionPlan
+
+
+def make_graph() -> ComputeGraph:
+    graph = ComputeGraph()
+
+    for id in range(4):
+        graph.add_node(id, "Stub", {}, {"x": 0, "y": 0})
+
+    graph.add_edge("e1out-2in", 1, 2, "out", "in")
+    graph.add_edge("e0out-1in", 0, 1, "out", "in")
+    graph.add_edge("e0out-2extra", 0, 2, "out", "extra")
+
+    return graph
+
+
+def test_orders_component_of_target():
+    plan = ExecutionPlan(make_graph(), 2)
+
+    assert plan.order == [0, 1, 2]
+    assert plan.inputs[0] == []
+    assert plan.inputs[1] == [(0, "out", "in")]
+    assert sorted(plan.inputs[2]) == [(0, "out", "extra"), (1, "out", "in")]
+    assert plan.sinks == {2}
+
+
+def test_target_is_a_sink():
+    plan = ExecutionPlan(make_graph(), 1)
+
+    assert plan.sinks == {plan.order.index(1), plan.order.index(2)}
+
+
+def test_isolated_target():
+    plan = ExecutionPlan(make_graph(), 3)
+
+    assert plan.order == [3]
+    assert plan.sinks == {0}
+
+
+def test_rejects_cycles():
+    graph = make_graph()
+    graph.add_edge("e2out-0in", 2, 0, "out", "in")
+
+    with pytest.raises(Exception, match="cycle"):
+        ExecutionPlan(graph, 0)
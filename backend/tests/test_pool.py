@@ -0,0 +1,94 @@
+from api.compute.executor import Control, JobStatus
+from api.compute.graph import ComputeGraph
+from api.compute.jobs import JobState
+from api.compute.pool import ExecutorPool
+
+
+class StubExecutor:
+    def __init__(self, name: str):
+        self.name = name
+        self.job = None
+        self.resident = set()
+        self.control = Control.NONE
+        self.on_idle = None
+
+    @property
+    def idle(self) -> bool:
+        return self.job is None
+
+    def enqueue(self, job):
+        self.job = job
+        self.control = Control.NONE
+
+    def cancel(self):
+        self.control = Control.CANCEL
+
+    def suspend(self):
+        self.control = Control.SUSPEND
+
+    def report(self, state: JobState):
+        job, self.job = self.job, None
+        self.on_idle(self, JobStatus(id=job.id, state=state, keys=set()))
+
+
+def make_graph() -> ComputeGraph:
+    graph = ComputeGraph()
+
+    for id in range(2):
+        graph.add_node(id, "Stub", {"id": id}, {"x": 0, "y": 0})
+
+    return graph
+
+
+def test_running_job_takes_identical_request():
+    executor = StubExecutor("cpu:0")
+    pool = ExecutorPool([executor], preempt=True)
+    graph = make_graph()
+
+    job = pool.enqueue(graph, 1, 0, priority=0)
+    again = pool.enqueue(graph, 1, 0, priority=5)
+
+    assert again is job
+    assert job.priority == 5
+    assert executor.control is Control.NONE
+    assert len(pool.jobs) == 0
+
+
+def test_preempted_job_resumes_after_higher_priority_job():
+    executor = StubExecutor("cpu:0")
+    pool = ExecutorPool([executor], preempt=True)
+    graph = make_graph()
+
+    low = pool.enqueue(graph, 1, 0, priority=0)
+    high = pool.enqueue(graph, 1, 1, priority=5)
+
+    assert executor.job is low
+    assert executor.control is Control.SUSPEND
+
+    executor.report(JobState.SUSPENDED)
+
+    assert executor.job is high
+    assert low.state is JobState.SUSPENDED
+
+    executor.report(JobState.DONE)
+
+    assert executor.job is low
+    assert low.state is JobState.RUNNING
+    assert pool.jobs.get(high.id).state is JobState.DONE
+
+
+def test_cancelled_job_is_not_preempted():
+    executor = StubExecutor("cpu:0")
+    pool = ExecutorPool([executor], preempt=True)
+    graph = make_graph()
+
+    low = pool.enqueue(graph, 1, 0, priority=0)
+    pool.cancel(low.id)
+    high = pool.enqueue(graph, 1, 1, priority=5)
+
+    assert executor.control is Control.CANCEL
+
+    executor.report(JobState.CANCELLED)
+
+    assert executor.job is high
+    assert pool.jobs.get(low.id).state is JobState.CANCELLED
@@ -0,0 +1,62 @@
+import pytest
+
+from api.compute.resources import ResourceManager, parse_cpulist
+
+
+def make_manager(monkeypatch, nodes: dict[int, list[int]], reserved: int = 0):
+    manager = ResourceManager(
+        {c for cores in nodes.values() for c in cores}, reserved=reserved
+    )
+    monkeypatch.setattr(
+        manager,
+        "numa_nodes",
+        lambda: {k: [c for c in v if c in manager.cores] for k, v in nodes.items()},
+    )
+
+    return manager
+
+
+def test_parse_cpulist():
+    assert parse_cpulist("0-3,8,10-11\n") == {0, 1, 2, 3, 8, 10, 11}
+
+
+def test_whole_nodes_per_worker(monkeypatch):
+    manager = make_manager(monkeypatch, {0: [0, 1, 2, 3], 1: [4, 5, 6, 7]})
+
+    assignments = manager.assign(["cpu:0", "cpu:1"])
+
+    assert assignments["cpu:0"].cores == {0, 1, 2, 3}
+    assert assignments["cpu:0"].numa_nodes == {0}
+    assert assignments["cpu:1"].cores == {4, 5, 6, 7}
+    assert assignments["cpu:1"].intra_op_threads == 4
+
+
+def test_workers_split_within_nodes(monkeypatch):
+    manager = make_manager(monkeypatch, {0: [0, 1, 2], 1: [3, 4, 5]})
+
+    assignments = manager.assign([f"cpu:{i}" for i in range(4)])
+    cores = [a.cores for a in assignments.values()]
+
+    assert sorted(map(len, cores)) == [1, 1, 2, 2]
+    assert set().union(*cores) == manager.cores
+    assert sum(map(len, cores)) == len(manager.cores)
+
+    for a in assignments.values():
+        (node,) = a.numa_nodes
+        assert a.cores <= set(range(3 * node, 3 * node + 3))
+
+
+def test_reserved_cores_are_left_to_the_api(monkeypatch):
+    manager = make_manager(monkeypatch, {0: [0, 1, 2, 3]}, reserved=1)
+
+    assert manager.assign(["cpu:0"])["cpu:0"].cores == {1, 2, 3}
+
+
+def test_rejects_more_workers_than_cores(monkeypatch):
+    manager = make_manager(monkeypatch, {0: [0, 1]})
+
+    with pytest.raises(ValueError):
+        manager.assign(["cpu:0", "cpu:1", "cpu:2"])
+
+    with pytest.raises(ValueError):
+        ResourceManager({0, 1}, reserved=2)
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from api.services.websocket import Outbox, WebSocketHandler
+
+
+class StubWebSocket:
+    def __init__(self, *frames):
+        self.scope = {"subprotocols": []}
+        self.frames = list(frames)
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def receive_json(self):
+        frame = self.frames.pop(0)
+
+        if isinstance(frame, Exception):
+            raise frame
+
+        return frame
+
+    async def send_text(self, message):
+        pass
+
+
+def test_listen_forgets_socket_after_error():
+    handler = WebSocketHandler()
+    websocket = StubWebSocket(
+        {"stream": "streams", "data": {"streams": ["graph"], "action": "subscribe"}},
+        ValueError("malformed frame"),
+    )
+
+    with pytest.raises(ValueError):
+        asyncio.run(handler.listen(websocket))
+
+    assert not handler._active
+    assert not handler._outboxes
+    assert not handler._encodings
+
+
+def test_send_reaches_client_with_empty_outbox():
+    handler = WebSocketHandler()
+    websocket = object()
+
+    handler._outboxes[websocket] = outbox = Outbox(4)
+    handler._encodings[websocket] = "json"
+
+    handler.send(websocket, "graph", {"action": "syncGraph"})
+
+    assert len(outbox) == 1
+
+
+def test_outbox_merges_keyed_messages():
+    outbox = Outbox(4)
+
+    outbox.put("a", key="tree")
+    outbox.put("b")
+    outbox.put("c", key="tree")
+
+    assert len(outbox) == 2
+    assert asyncio.run(outbox.get()) == "c"
+    assert asyncio.run(outbox.get()) == "b"
+
+
+def test_outbox_drops_oldest_when_full():
+    outbox = Outbox(2)
+
+    for message in "xyz":
+        outbox.put(message)
+
+    assert outbox.dropped == 1
+    assert asyncio.run(outbox.get()) == "y"
+    assert asyncio.run(outbox.get()) == "z"
@@ -0,0 +1,240 @@
+import os
+import json
+import mmap
+import struct
+import hashlib
+import pathlib
+import itertools
+import threading
+import contextlib
+import concurrent.futures
+from os import environ as env
+from typing import Callable, TypeVar
+
+import torch
+import accelerate
+import safetensors.torch
+
+CACHE_DIR = os.path.join(env["DATA_DIR"], "cache", "checkpoints")
+
+# 0 uses one thread per core available to the worker, 1 loads serially
+LOAD_THREADS = int(env.get("LOAD_THREADS", 0))
+
+PRECISIONS = ["fp32", "bf16", "int8"]
+
+T = TypeVar("T")
+
+# accelerate.init_empty_weights patches torch.nn.Module globally while active
+module_lock = threading.RLock()
+
+SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+
+
+def load_threads() -> int:
+    return LOAD_THREADS or len(os.sched_getaffinity(0))
+
+
+def run_parallel(funcs: dict[str, Callable[[], T]], threads: int) -> dict[str, T]:
+    """
+    Results of calling each function, in a thread pool unless `threads` is 1
+    """
+
+    if threads <= 1 or len(funcs) <= 1:
+        return {k: f() for k, f in funcs.items()}
+
+    with concurrent.futures.ThreadPoolExecutor(min(threads, len(funcs))) as pool:
+        return dict(zip(funcs, pool.map(lambda f: f(), funcs.values())))
+
+
+@contextlib.contextmanager
+def empty_weights():
+    """
+    `accelerate.init_empty_weights` that is safe to use from loader threads
+    """
+
+    with module_lock, accelerate.init_empty_weights():
+        yield
+
+
+def mmap_safetensors(path: str) -> dict[str, torch.Tensor]:
+    """
+    Tensors of a safetensors file as views into a private memory map, so nothing is
+    read from disk until a weight is actually used
+    """
+
+    with open(path, "rb") as f:
+        (n,) = struct.unpack("<Q", f.read(8))
+        header: dict = json.loads(f.read(n))
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    header.pop("__metadata__", None)
+
+    tensors = {}
+    for key, info in header.items():
+        dtype = SAFETENSORS_DTYPES[info["dtype"]]
+        start, end = info["data_offsets"]
+
+        if start == end:
+            tensors[key] = torch.empty(info["shape"], dtype=dtype, device="cpu")
+        else:
+            tensors[key] = torch.frombuffer(
+                buffer,
+                dtype=dtype,
+                count=(end - start) // torch.empty(0, dtype=dtype).element_size(),
+                offset=8 + n + start,
+            ).view(info["shape"])
+
+    return tensors
+
+
+def load_state_dict(path: str) -> dict[str, torch.Tensor]:
+    if pathlib.Path(path).suffix == ".safetensors":
+        return mmap_safetensors(path)
+
+    try:
+        ckpt = torch.load(path, map_location="cpu", mmap=True)
+    except TypeError:
+        # torch<2.1 can't memory-map checkpoints
+        ckpt = torch.load(path, map_location="cpu")
+
+    while "state_dict" in ckpt:
+        ckpt = ckpt["state_dict"]
+
+    return ckpt
+
+
+def assign_state_dict(
+    module: torch.nn.Module, state_dict: dict[str, torch.Tensor], threads: int = 1
+) -> torch.nn.Module:
+    """
+    Assigns tensors directly as the parameters and buffers of a module created under
+    `empty_weights`, only copying those that need a dtype cast. With several threads
+    the page-ins and casts, which release the GIL, overlap
+    """
+
+    def assign(names: list[str]):
+        for name in names:
+            accelerate.utils.set_module_tensor_to_device(
+                module, name, "cpu", value=state_dict[name]
+            )
+
+    names = list(state_dict)
+    run_parallel(
+        {str(i): lambda i=i: assign(names[i::threads]) for i in range(threads)},
+        threads,
+    )
+
+    if missing := [
+        name
+        for name, tensor in itertools.chain(
+            module.named_parameters(), module.named_buffers()
+        )
+        if tensor.is_meta
+    ]:
+        raise ValueError(f"Missing weights for {missing}")
+
+    if (device := torch.empty(0).device).type != "cpu":
+        module.to(device)
+
+    return module.eval()
+
+
+def with_precision(
+    module: torch.nn.Module, precision: str, quantize: bool = True
+) -> torch.nn.Module:
+    """
+    Module cast to bf16 or with its linear layers dynamically quantized to int8, modules
+    that aren't to be quantized stay fp32 in that case
+    """
+
+    match precision:
+        case "bf16":
+            return module.to(torch.bfloat16)
+        case "int8" if quantize:
+            return torch.ao.quantization.quantize_dynamic(
+                module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+            )
+        case _:
+            return module
+
+
+def content_hash(path: str) -> str:
+    """
+    SHA-256 of a file, remembered per path, size and mtime so large checkpoints are
+    only hashed once
+    """
+
+    hashes_path = os.path.join(CACHE_DIR, "hashes.json")
+
+    try:
+        with open(hashes_path) as f:
+            hashes = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        hashes = {}
+
+    stat = os.stat(path := os.path.realpath(path))
+
+    if (entry := hashes.get(path)) and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return entry[2]
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(2**24):
+            sha.update(chunk)
+
+    hashes[path] = [stat.st_size, stat.st_mtime_ns, sha.hexdigest()]
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(tmp := f"{hashes_path}.{os.getpid()}", "w") as f:
+        json.dump(hashes, f)
+    os.replace(tmp, hashes_path)
+
+    return sha.hexdigest()
+
+
+def load_converted(
+    key: str,
+) -> tuple[dict[str, dict], dict[str, dict[str, torch.Tensor]]] | None:
+    """
+    Configs and memory-mapped weights of previously converted submodels, `config.json`
+    is written last and marks a complete entry
+    """
+
+    try:
+        with open(os.path.join(CACHE_DIR, key, "config.json")) as f:
+            configs: dict[str, dict] = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    return configs, {
+        k: mmap_safetensors(os.path.join(CACHE_DIR, key, f"{k}.safetensors"))
+        for k in configs
+    }
+
+
+def save_converted(
+    key: str, configs: dict[str, dict], modules: dict[str, torch.nn.Module]
+):
+    os.makedirs(path := os.path.join(CACHE_DIR, key), exist_ok=True)
+
+    for k, module in modules.items():
+        safetensors.torch.save_file(
+            {n: t.contiguous() for n, t in module.state_dict().items()},
+            tmp := os.path.join(path, f"{k}.safetensors.{os.getpid()}"),
+        )
+        os.replace(tmp, os.path.join(path, f"{k}.safetensors"))
+
+    with open(tmp := os.path.join(path, f"config.json.{os.getpid()}"), "w") as f:
+        json.dump(configs, f)
+    os.replace(tmp, os.path.join(path, "config.json"))
@@ -1,13 +1,20 @@
+from collections import OrderedDict
+from os import environ as env
+
 import torch
 import transformers
 
-from api.compute.graph import Node, NodeTemplate, components
+from api.compute.graph import Node, NodeTemplate, Batch, components
 
 from .types import CLIPModel
 
+EMBEDDING_CACHE_SIZE = int(env.get("EMBEDDING_CACHE_SIZE", 256))
+
+embeddings: OrderedDict[tuple[str, str], torch.Tensor] = OrderedDict()
+
 
 class CLIPEncode(Node):
-    _input_text: str
+    _input_text: str | list[str]
 
     template = NodeTemplate(
         inputs={"clip": {"name": "CLIP", "type": CLIPModel}},
@@ -23,17 +30,42 @@ class CLIPEncode(Node):
                 ),
             }
         },
+        batch={"input_text"},
     )
 
-    def __call__(self, clip):
-        return self._encode_prompt(clip, self._input_text)
-
-    @torch.no_grad()
-    def _encode_prompt(self, clip: transformers.CLIPTextModel, prompt: str):
-        tokenizer: transformers.CLIPTokenizer = (
-            transformers.CLIPTokenizer.from_pretrained("openai/clip-vit-large-patch14")
+    def __call__(self, clip: CLIPModel):
+        prompts = (
+            [self._input_text]
+            if isinstance(self._input_text, str)
+            else self._input_text
         )
 
+        if missing := list(
+            dict.fromkeys(p for p in prompts if (clip.key, p) not in embeddings)
+        ):
+            for prompt, text_embeddings in zip(
+                missing,
+                self._encode_prompt(clip.clip, clip.tokenizer, missing).split(1),
+            ):
+                embeddings[clip.key, prompt] = text_embeddings
+
+        for prompt in prompts:
+            embeddings.move_to_end((clip.key, prompt))
+
+        result = [embeddings[clip.key, p] for p in prompts]
+
+        while len(embeddings) > EMBEDDING_CACHE_SIZE:
+            embeddings.popitem(last=False)
+
+        return result[0] if isinstance(self._input_text, str) else Batch(result)
+
+    @torch.no_grad()
+    def _encode_prompt(
+        self,
+        clip: transformers.CLIPTextModel,
+        tokenizer: transformers.CLIPTokenizer,
+        prompt: str | list[str],
+    ):
         text_input = tokenizer(
             prompt,
             padding="max_length",
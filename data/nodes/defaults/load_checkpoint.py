@@ -1,16 +1,31 @@
 import os
-import pathlib
+import json
+import hashlib
 from os import environ as env
 
 import torch
-import safetensors
 import diffusers, transformers
 from omegaconf import OmegaConf
 from diffusers.pipelines.stable_diffusion.convert_from_ckpt import *
 
 from api.compute.graph import Node, NodeTemplate, components
+from api.compute.models import registry
 
 from .types import CLIPModel
+from .tokenizers import resolve_tokenizer
+from .checkpoint import (
+    PRECISIONS,
+    module_lock,
+    empty_weights,
+    load_threads,
+    run_parallel,
+    load_state_dict,
+    assign_state_dict,
+    with_precision,
+    content_hash,
+    load_converted,
+    save_converted,
+)
 
 
 class LoadCheckpoint(Node):
@@ -19,6 +34,7 @@ class LoadCheckpoint(Node):
     _upcast_att: bool
     _use_ema: bool
     _size_768: bool
+    _precision: str
 
     template = NodeTemplate(
         values={
@@ -44,12 +60,18 @@ class LoadCheckpoint(Node):
                 "name": "768 Model",
                 "component": components.Checkbox(default=True),
             },
+            "precision": {
+                "name": "Precision",
+                "component": components.Dropdown(default="fp32", options=PRECISIONS),
+            },
         },
         outputs={
             "clip": {"name": "CLIP", "type": CLIPModel},
             "unet": {"name": "UNet", "type": diffusers.UNet2DConditionModel},
             "vae": {"name": "VAE", "type": diffusers.AutoencoderKL},
         },
+        compile={"unet"},
+        cache=False,
     )
 
     def __call__(self):
@@ -61,63 +83,152 @@ class LoadCheckpoint(Node):
             env["DATA_DIR"], "models", "checkpoints", *self._ckpt_path
         )
 
-        if pathlib.Path(ckpt_path).suffix == ".safetensors":
-            ckpt = {}
-            with safetensors.safe_open(ckpt_path, framework="pt", device="cpu") as f:
-                for key in f.keys():
-                    ckpt[key] = f.get_tensor(key)
-        else:
-            ckpt = torch.load(ckpt_path)
+        key = hashlib.sha256(
+            json.dumps(
+                [
+                    content_hash(ckpt_path),
+                    self._cfg_path,
+                    self._use_ema,
+                    self._size_768,
+                ]
+            ).encode()
+        ).hexdigest()
+
+        # precision variants are separate models sharing one converted checkpoint
+        self._lease = registry.acquire(
+            f"{key}-{self._precision}",
+            lambda: self._load(key, ckpt_path, config_path),
+        )
 
+        return dict(self._lease.value)
+
+    def _load(self, key: str, ckpt_path: str, config_path: str) -> dict:
         config = OmegaConf.load(config_path)
 
-        return {
-            "unet": self._load_unet(ckpt, config),
-            "vae": self._load_vae(ckpt, config),
-            "clip": self._load_clip(ckpt, config),
+        # submodels load side by side, splitting the threads between them
+        threads = load_threads()
+        self._threads = max(1, threads // 3)
+
+        if converted := load_converted(key):
+            models = self._load_converted(*converted, threads)
+        else:
+            ckpt = load_state_dict(ckpt_path)
+
+            models = run_parallel(
+                {
+                    "unet": lambda: self._load_unet(ckpt, config),
+                    "vae": lambda: self._load_vae(ckpt, config),
+                    "clip": lambda: self._load_clip(ckpt, config),
+                },
+                threads,
+            )
+
+            save_converted(
+                key,
+                {
+                    "unet": dict(models["unet"].config),
+                    "vae": dict(models["vae"].config),
+                    "clip": models["clip"].config.to_dict(),
+                },
+                models,
+            )
+
+        for model in models.values():
+            model.requires_grad_(False)
+
+        models = {
+            k: with_precision(v, self._precision, quantize=k != "vae")
+            for k, v in models.items()
         }
 
+        models["clip"] = CLIPModel(
+            key=f"{key}-{self._precision}",
+            clip=models["clip"],
+            tokenizer=resolve_tokenizer(
+                ckpt_path, config.model.params.cond_stage_config.target.split(".")[-1]
+            ),
+        )
+
+        return models
+
+    def _load_converted(
+        self,
+        configs: dict[str, dict],
+        weights: dict[str, dict[str, torch.Tensor]],
+        threads: int,
+    ) -> dict:
+        with empty_weights():
+            models = {
+                "unet": diffusers.UNet2DConditionModel.from_config(configs["unet"]),
+                "vae": diffusers.AutoencoderKL.from_config(configs["vae"]),
+                "clip": transformers.CLIPTextModel(
+                    transformers.CLIPTextConfig.from_dict(configs["clip"])
+                ),
+            }
+
+        return run_parallel(
+            {
+                k: lambda k=k, v=v: assign_state_dict(v, weights[k], self._threads)
+                for k, v in models.items()
+            },
+            threads,
+        )
+
     def _load_unet(
-        self, ckpt: torch.Tensor, config: OmegaConf
+        self, ckpt: dict[str, torch.Tensor], config: OmegaConf
     ) -> diffusers.UNet2DConditionModel:
         unet_config = create_unet_diffusers_config(
             config, image_size=(768 if self._size_768 else 512)
         )
 
-        unet = diffusers.UNet2DConditionModel(**unet_config)
+        with empty_weights():
+            unet = diffusers.UNet2DConditionModel(**unet_config)
 
         unet_weights = convert_ldm_unet_checkpoint(
             ckpt, unet_config, extract_ema=self._use_ema
         )
 
-        unet.load_state_dict(unet_weights)
-
-        return unet
+        return assign_state_dict(unet, unet_weights, self._threads)
 
     def _load_vae(
-        self, ckpt: torch.Tensor, config: OmegaConf
+        self, ckpt: dict[str, torch.Tensor], config: OmegaConf
     ) -> diffusers.AutoencoderKL:
         vae_config = create_vae_diffusers_config(
             config, image_size=(768 if self._size_768 else 512)
         )
 
-        vae = diffusers.AutoencoderKL(**vae_config)
+        with empty_weights():
+            vae = diffusers.AutoencoderKL(**vae_config)
 
         vae_weights = convert_ldm_vae_checkpoint(ckpt, vae_config)
 
-        vae.load_state_dict(vae_weights)
-
-        return vae
+        return assign_state_dict(vae, vae_weights, self._threads)
 
     def _load_clip(
-        self, ckpt: torch.Tensor, config: OmegaConf
+        self, ckpt: dict[str, torch.Tensor], config: OmegaConf
     ) -> transformers.CLIPTextModel:
         if (
             clip_type := config.model.params.cond_stage_config.target.split(".")[-1]
         ) == "FrozenOpenCLIPEmbedder":
-            clip = convert_open_clip_checkpoint(ckpt)
+            with module_lock:
+                clip = convert_open_clip_checkpoint(ckpt)
         elif clip_type == "FrozenCLIPEmbedder":
-            clip = convert_ldm_clip_checkpoint(ckpt)
+            with empty_weights():
+                clip = transformers.CLIPTextModel(
+                    transformers.CLIPTextConfig.from_pretrained(
+                        "openai/clip-vit-large-patch14"
+                    )
+                )
+
+            clip = assign_state_dict(
+                clip,
+                {
+                    k.removeprefix(prefix): v
+                    for k, v in ckpt.items()
+                    if k.startswith(prefix := "cond_stage_model.transformer.")
+                },
+                self._threads,
+            )
         else:
             raise ValueError(
                 f"CLIP type is {clip_type}, should be 'FrozenCLIPEmbedder or FrozenOpenCLIPEmbedder"
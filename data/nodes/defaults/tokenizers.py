@@ -0,0 +1,36 @@
+import os
+import functools
+from os import environ as env
+
+import transformers
+
+TOKENIZERS = {
+    "FrozenCLIPEmbedder": ("openai/clip-vit-large-patch14", ""),
+    "FrozenOpenCLIPEmbedder": ("stabilityai/stable-diffusion-2", "tokenizer"),
+}
+
+
+@functools.cache
+def load_tokenizer(path: str, subfolder: str = "") -> transformers.CLIPTokenizer:
+    return transformers.CLIPTokenizer.from_pretrained(
+        path, subfolder=subfolder, local_files_only=True
+    )
+
+
+def resolve_tokenizer(ckpt_path: str, clip_type: str) -> transformers.CLIPTokenizer:
+    """
+    Tokenizer for a checkpoint from local files only, looking for a `tokenizer`
+    directory next to the checkpoint, then `DATA_DIR/models/tokenizers/<name>` and
+    finally the Hugging Face cache
+    """
+
+    repo, subfolder = TOKENIZERS[clip_type]
+
+    for path in (
+        os.path.join(os.path.dirname(ckpt_path), "tokenizer"),
+        os.path.join(env["DATA_DIR"], "models", "tokenizers", repo.split("/")[-1]),
+    ):
+        if os.path.isdir(path):
+            return load_tokenizer(os.path.realpath(path))
+
+    return load_tokenizer(repo, subfolder)
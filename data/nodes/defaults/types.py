@@ -4,6 +4,7 @@ import transformers
 
 
 class CLIPModel(BaseModel):
+    key: str
     clip: transformers.CLIPTextModel
     tokenizer: transformers.CLIPTokenizer
 
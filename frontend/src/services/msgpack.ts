@@ -0,0 +1,175 @@
+// Minimal MessagePack codec covering the types the API exchanges: nil, booleans,
+// numbers, strings, binary, arrays and maps
+
+const textEncoder = new TextEncoder()
+const textDecoder = new TextDecoder()
+
+export function encode(value: any): Uint8Array {
+  const bytes: number[] = []
+
+  function pushUint(n: number, size: number) {
+    for (let i = size - 1; i >= 0; i--) bytes.push(Math.floor(n / 2 ** (8 * i)) & 0xff)
+  }
+
+  function pushLength(length: number, fix: number | null, fixMax: number, codes: number[]) {
+    if (fix !== null && length <= fixMax) bytes.push(fix | length)
+    else if (codes[0] && length < 2 ** 8) bytes.push(codes[0], length)
+    else if (length < 2 ** 16) {
+      bytes.push(codes[1])
+      pushUint(length, 2)
+    } else {
+      bytes.push(codes[2])
+      pushUint(length, 4)
+    }
+  }
+
+  function write(value: any) {
+    if (value === null || value === undefined) bytes.push(0xc0)
+    else if (value === false) bytes.push(0xc2)
+    else if (value === true) bytes.push(0xc3)
+    else if (typeof value === 'number') {
+      if (Number.isInteger(value) && value >= 0 && value < 2 ** 32) {
+        if (value < 0x80) bytes.push(value)
+        else if (value < 2 ** 8) bytes.push(0xcc, value)
+        else if (value < 2 ** 16) {
+          bytes.push(0xcd)
+          pushUint(value, 2)
+        } else {
+          bytes.push(0xce)
+          pushUint(value, 4)
+        }
+      } else if (Number.isInteger(value) && value < 0 && value >= -(2 ** 31)) {
+        if (value >= -32) bytes.push(value & 0xff)
+        else {
+          bytes.push(0xd2)
+          pushUint(value >>> 0, 4)
+        }
+      } else {
+        const view = new DataView(new ArrayBuffer(8))
+        view.setFloat64(0, value)
+
+        bytes.push(0xcb, ...new Uint8Array(view.buffer))
+      }
+    } else if (typeof value === 'string') {
+      const encoded = textEncoder.encode(value)
+
+      pushLength(encoded.length, 0xa0, 31, [0xd9, 0xda, 0xdb])
+      bytes.push(...encoded)
+    } else if (value instanceof Uint8Array) {
+      pushLength(value.length, null, 0, [0xc4, 0xc5, 0xc6])
+      bytes.push(...value)
+    } else if (Array.isArray(value)) {
+      pushLength(value.length, 0x90, 15, [0, 0xdc, 0xdd])
+      for (const item of value) write(item)
+    } else if (typeof value === 'object') {
+      const entries = Object.entries(value).filter(([_, v]) => v !== undefined)
+
+      pushLength(entries.length, 0x80, 15, [0, 0xde, 0xdf])
+      for (const [k, v] of entries) {
+        write(k)
+        write(v)
+      }
+    } else throw new Error(`Cannot encode value of type '${typeof value}'`)
+  }
+
+  write(value)
+
+  return new Uint8Array(bytes)
+}
+
+export function decode(buffer: ArrayBuffer): any {
+  const view = new DataView(buffer)
+  let offset = 0
+
+  function uint(size: number) {
+    let n = 0
+    for (let i = 0; i < size; i++) n = n * 256 + view.getUint8(offset++)
+
+    return n
+  }
+
+  function bytes(length: number) {
+    const slice = new Uint8Array(buffer, offset, length)
+    offset += length
+
+    return slice
+  }
+
+  function array(length: number): any[] {
+    return Array.from({ length }, read)
+  }
+
+  function map(length: number) {
+    const obj: { [key: string]: any } = {}
+    for (let i = 0; i < length; i++) obj[read()] = read()
+
+    return obj
+  }
+
+  function read(): any {
+    const code = view.getUint8(offset++)
+
+    if (code < 0x80) return code
+    if (code < 0x90) return map(code & 0x0f)
+    if (code < 0xa0) return array(code & 0x0f)
+    if (code < 0xc0) return textDecoder.decode(bytes(code & 0x1f))
+    if (code >= 0xe0) return code - 0x100
+
+    let value: any
+    switch (code) {
+      case 0xc0:
+        return null
+      case 0xc2:
+        return false
+      case 0xc3:
+        return true
+      case 0xc4:
+      case 0xc5:
+      case 0xc6:
+        return bytes(uint(2 ** (code - 0xc4))).slice()
+      case 0xca:
+        value = view.getFloat32(offset)
+        offset += 4
+        return value
+      case 0xcb:
+        value = view.getFloat64(offset)
+        offset += 8
+        return value
+      case 0xcc:
+      case 0xcd:
+      case 0xce:
+      case 0xcf:
+        return uint(2 ** (code - 0xcc))
+      case 0xd0:
+        value = view.getInt8(offset)
+        offset += 1
+        return value
+      case 0xd1:
+        value = view.getInt16(offset)
+        offset += 2
+        return value
+      case 0xd2:
+        value = view.getInt32(offset)
+        offset += 4
+        return value
+      case 0xd3:
+        value = Number(view.getBigInt64(offset))
+        offset += 8
+        return value
+      case 0xd9:
+      case 0xda:
+      case 0xdb:
+        return textDecoder.decode(bytes(uint(2 ** (code - 0xd9))))
+      case 0xdc:
+      case 0xdd:
+        return array(uint(2 ** (code - 0xdb)))
+      case 0xde:
+      case 0xdf:
+        return map(uint(2 ** (code - 0xdd)))
+      default:
+        throw new Error(`Unsupported MessagePack type 0x${code.toString(16)}`)
+    }
+  }
+
+  return read()
+}
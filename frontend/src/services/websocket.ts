@@ -1,3 +1,5 @@
+import { encode, decode } from '@/services/msgpack'
+
 export class WebSocketHandler extends EventTarget {
   websocket: WebSocket | null
   active: boolean
@@ -23,8 +25,11 @@ export class WebSocketHandler extends EventTarget {
         ? 'ws://localhost:8000/ws'
         : `${location.protocol.includes('https') ? 'wss' : 'ws'}://${location.hostname}:${
             location.port
-          }/api/v1/ws`
+          }/api/v1/ws`,
+      // the server picks the first encoding it supports
+      ['msgpack', 'json']
     )
+    this.websocket.binaryType = 'arraybuffer'
 
     this.websocket.onopen = () => {
       this.active = true
@@ -51,7 +56,11 @@ export class WebSocketHandler extends EventTarget {
     }
 
     this.websocket.onmessage = (event) => {
-      super.dispatchEvent(new CustomEvent('message', { detail: JSON.parse(event.data) }))
+      super.dispatchEvent(
+        new CustomEvent('message', {
+          detail: event.data instanceof ArrayBuffer ? decode(event.data) : JSON.parse(event.data)
+        })
+      )
     }
   }
 
@@ -64,7 +73,9 @@ export class WebSocketHandler extends EventTarget {
   async send(stream: string, data: object) {
     if (!this.websocket) throw new Error('Websocket not connected')
 
-    this.websocket.send(JSON.stringify({ stream: stream, data: data }))
+    if (this.websocket.protocol === 'msgpack')
+      this.websocket.send(encode({ stream: stream, data: data }))
+    else this.websocket.send(JSON.stringify({ stream: stream, data: data }))
   }
 }
 
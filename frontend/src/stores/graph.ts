@@ -110,26 +110,76 @@ export const useGraphStore = defineStore('graph', () => {
     }
   }
 
+  interface ActionSchema {
+    version: number
+    action: string
+    id?: string | number
+    position?: { x: number; y: number }
+    node?: NodeSchema
+    edge?: EdgeSchema
+    actions?: ActionSchema[]
+  }
+
+  async function resyncGraph() {
+    const res = await fetch(
+      new URL(`graph/actions?since=${version.value}`, app.config.globalProperties.apiURL),
+      {
+        method: 'GET',
+        headers: {
+          Accept: 'application/json',
+          'Content-Type': 'application/json;charset=UTF-8'
+        }
+      }
+    )
+
+    // missed actions are no longer kept
+    if (!res.ok) {
+      fetchGraph()
+      return
+    }
+
+    const { actions } = await res.json()
+
+    for (const action of actions) receiveAction(action)
+  }
+
   webSocketHandler.addEventListener('message', (event) => {
     const msg = (<CustomEvent>event).detail
 
     if (msg.stream != 'graph') return
 
-    const data = msg.data as {
-      version: number
-      action: string
-      id?: string | number
-      node?: NodeSchema
-      edge?: EdgeSchema
+    receiveAction(msg.data as ActionSchema)
+  })
+
+  function isPositions(data: ActionSchema): boolean {
+    if (data.action === 'batch') return !!data.actions?.every(isPositions)
+
+    return data.action === 'updatePositionNode'
+  }
+
+  function receiveAction(data: ActionSchema) {
+    if (data.action === 'syncGraph') {
+      fetchGraph()
+      return
+    }
+
+    // positions commute with every other action and carry no version of their own
+    if (isPositions(data)) {
+      applyAction(data)
+      return
     }
 
     if (data.version <= version.value) return
-    else if (data.version > version.value + 1) {
-      fetchGraph()
+    else if (data.version - 1 > version.value) {
+      resyncGraph()
       return
     }
-    version.value++
+    version.value = data.version
+
+    applyAction(data)
+  }
 
+  function applyAction(data: ActionSchema) {
     switch (data.action) {
       case undefined:
         throw new Error(`Required value 'action' not received`)
@@ -149,16 +199,13 @@ export const useGraphStore = defineStore('graph', () => {
 
         break
       case 'updatePositionNode':
-        if (!data.node) throw new Error(`Required value 'node' not received`)
+        if (typeof data.id !== 'number') throw new Error(`Required value 'id' not received`)
+        if (!data.position) throw new Error(`Required value 'position' not received`)
 
-        const node = getNode(data.node.id)
+        const node = getNode(data.id)
 
-        if (!node) {
-          fetchGraph()
-          throw new Error(`Node '${data.node.id}' does not exist, resyncing graph...`)
-        }
-
-        node.position = data.node.position
+        // the node may have been deleted since
+        if (node) node.position = data.position
 
         break
       case 'updateValuesNode':
@@ -190,11 +237,21 @@ export const useGraphStore = defineStore('graph', () => {
         if (idx > -1) edges.value.splice(idx, 1)
         else throw new Error(`Invalid edge ID ${data.id}`)
 
+        break
+      case 'reloadNodes':
+        fetchGraph()
+
+        break
+      case 'batch':
+        if (!data.actions) throw new Error(`Required value 'actions' not received`)
+
+        for (const action of data.actions) applyAction(action)
+
         break
       default:
         throw new Error(`Unrecognized action '${data.action}''`)
     }
-  })
+  }
 
   if (webSocketHandler.active) startListening()
 
@@ -264,13 +321,11 @@ export const useGraphStore = defineStore('graph', () => {
 
     if (!node) throw new Error(`Invalid node ID '${id}'`)
 
-    version.value++
-
     node.position = position
 
     webSocketHandler.send('graph', {
       item: {
-        version: version.value - 1,
+        version: version.value,
         action: 'updatePositionNode',
         id: id,
         position: position
@@ -278,6 +333,30 @@ export const useGraphStore = defineStore('graph', () => {
     })
   }
 
+  function updatePositionNodes(positions: { id: number; position: { x: number; y: number } }[]) {
+    if (positions.length === 1) return updatePositionNode(positions[0].id, positions[0].position)
+
+    for (const { id, position } of positions) {
+      const node = nodes.value.find((node) => node.id === `${id}`)
+
+      if (!node) throw new Error(`Invalid node ID '${id}'`)
+
+      node.position = position
+    }
+
+    webSocketHandler.send('graph', {
+      item: {
+        version: version.value,
+        action: 'batch',
+        actions: positions.map(({ id, position }) => ({
+          action: 'updatePositionNode',
+          id: id,
+          position: position
+        }))
+      }
+    })
+  }
+
   function updateValuesNode(id: number, values: { [key: string]: any }) {
     const node = nodes.value.find((node) => node.id === `${id}`)
 
@@ -364,6 +443,7 @@ export const useGraphStore = defineStore('graph', () => {
     addNode,
     removeNode,
     updatePositionNode,
+    updatePositionNodes,
     updateValuesNode,
     addEdge,
     removeEdge